@@ -0,0 +1,118 @@
+import os
+import json
+import shutil
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from write_lock import atomic_write
+
+# Cubes written as .npy files and memory-mapped, so every dashboard worker on
+# the box shares one copy through the page cache
+SHARED_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "cache", "shared"))
+
+# Prefix sums of monthly counts per area: cum[:, j] is the total over the first
+# j months, so the total over months [i0, i1] is cum[:, i1 + 1] - cum[:, i0].
+PrefixCube = namedtuple("PrefixCube", ["codes", "first_month", "cum"])
+
+def month_index(months) -> np.ndarray:
+    """Months as consecutive integers (year * 12 + month - 1)."""
+    months = pd.DatetimeIndex(months)
+    return (months.year * 12 + months.month - 1).to_numpy(np.int32)
+
+def month_label(idx: int) -> str:
+    year, month = divmod(int(idx), 12)
+    return f"{year}-{month + 1:02d}"
+
+def build_cubes(df, lsoa_to_ward, value_col="burglary_count"):
+    """LSOA- and ward-level prefix-sum cubes from the lsoa_code/month/value rows of `df`.
+
+    Only LSOAs with a ward are kept, like the maps. Months missing from the
+    data count as zero.
+    """
+    df = df[df.lsoa_code.isin(lsoa_to_ward)]
+    lsoa_codes, lsoa_pos = np.unique(df.lsoa_code.to_numpy(dtype=str), return_inverse=True)
+    months = month_index(df.month)
+    first = int(months.min()) if len(months) else 0
+    n_months = int(months.max()) - first + 1 if len(months) else 0
+
+    counts = np.zeros((len(lsoa_codes), n_months), dtype=np.int64)
+    np.add.at(counts, (lsoa_pos, months - first), df[value_col].fillna(0).to_numpy(dtype=np.int64))
+
+    ward_of_lsoa = np.array([lsoa_to_ward[c] for c in lsoa_codes], dtype=str)
+    ward_codes, ward_pos = np.unique(ward_of_lsoa, return_inverse=True)
+    ward_counts = np.zeros((len(ward_codes), n_months), dtype=np.int64)
+    np.add.at(ward_counts, ward_pos, counts)
+
+    def prefix(counts):
+        cum = np.zeros((counts.shape[0], n_months + 1), dtype=np.int64)
+        np.cumsum(counts, axis=1, out=cum[:, 1:])
+        return cum
+
+    return {
+        "lsoa": PrefixCube(lsoa_codes, first, prefix(counts)),
+        "ward": PrefixCube(ward_codes, first, prefix(ward_counts)),
+    }
+
+def month_bounds(cube: PrefixCube):
+    """(first, last) month index covered by the cube."""
+    return cube.first_month, cube.first_month + cube.cum.shape[1] - 2
+
+def range_sum(cube: PrefixCube, m0: int, m1: int) -> pd.DataFrame:
+    """Per-area totals over months m0..m1 (inclusive month indices) as code/count rows."""
+    i0 = min(max(int(m0) - cube.first_month, 0), cube.cum.shape[1] - 1)
+    i1 = min(max(int(m1) - cube.first_month + 1, i0), cube.cum.shape[1] - 1)
+    return pd.DataFrame({"code": cube.codes, "count": cube.cum[:, i1] - cube.cum[:, i0]})
+
+# ─── Shared (memory-mapped) cubes ─────────────────────────────────────────────
+def _write_cube_dir(tmp, cubes):
+    os.makedirs(tmp)
+    meta = {}
+    for level, cube in cubes.items():
+        np.save(os.path.join(tmp, f"{level}_codes.npy"), np.asarray(cube.codes, dtype=str))
+        np.save(os.path.join(tmp, f"{level}_cum.npy"), cube.cum)
+        meta[level] = {"first_month": int(cube.first_month)}
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+def _save_cubes(cubes, entry_dir):
+    try:
+        atomic_write(entry_dir, _write_cube_dir, cubes)
+    except OSError:  # another worker published the same cubes first
+        pass
+
+def _load_cubes(entry_dir):
+    with open(os.path.join(entry_dir, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    return {
+        level: PrefixCube(
+            np.load(os.path.join(entry_dir, f"{level}_codes.npy"), mmap_mode="r"),
+            m["first_month"],
+            np.load(os.path.join(entry_dir, f"{level}_cum.npy"), mmap_mode="r"),
+        )
+        for level, m in meta.items()
+    }
+
+def shared_cubes(source_path, build, shared_dir=SHARED_DIR):
+    """Cubes for the current version of `source_path`, memory-mapped from disk.
+
+    The first process to need a version builds and publishes it (one atomic
+    directory rename); the others map the same files. Publishing a version
+    removes all but the one before it, which workers that have not seen the
+    new source yet may still have mapped.
+    """
+    st = os.stat(source_path)
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    entry_dir = os.path.join(shared_dir, f"{stem}_cubes_{st.st_mtime_ns}_{st.st_size}")
+    if not os.path.exists(os.path.join(entry_dir, "meta.json")):
+        os.makedirs(shared_dir, exist_ok=True)
+        _save_cubes(build(), entry_dir)
+        older = sorted(
+            (int(name.split("_")[-2]), name) for name in os.listdir(shared_dir)
+            if name.startswith(f"{stem}_cubes_") and not name.endswith(".tmp")
+            and int(name.split("_")[-2]) < st.st_mtime_ns
+        )
+        for _, old in older[:-1]:  # keep the previous generation
+            shutil.rmtree(os.path.join(shared_dir, old), ignore_errors=True)
+    return _load_cubes(entry_dir)
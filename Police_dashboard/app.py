@@ -1,5 +1,5 @@
 import os
-import json
+import sys
 import base64
 import io
 import numpy as np
@@ -10,19 +10,35 @@ from dash import dcc, html, dash_table
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
 
-from flask import Flask, send_from_directory
+from flask import Flask, Response, request, jsonify
 
 import pandas as pd
 import geopandas as gpd
 import plotly.express as px
+import plotly.graph_objects as go
 from shapely import Point
-from shapely.geometry import shape
 
 import joblib
 from scipy.stats import entropy
-from helper import save_prediction
+# root-level shared modules (feature cache, dtype policy, write lock, ...)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from feature_cache import cached_features, FeatureSet
+from dtype_policy import apply_dtype_policy
+from community_aggregates import ensure_community_aggregates
+from generate_schedules import write_schedules
 
-import random
+from helper import save_prediction
+from explain import top_drivers
+from data_store import store
+from write_lock import WRITE_LOCK, REQUEST_LOCK_TIMEOUT, Timeout, atomic_write
+from figure_cache import FigureCache
+from metrics import metrics, timed, instrument
+from schedule_store import SCHEDULE_CSV, ward_schedule
+from static_files import send_cached, DATA_CACHE
+from query_api import run_query, to_json, to_arrow, QueryError
+from aggregates import build_cubes, shared_cubes, month_bounds, month_label, range_sum
+from geo_index import load_lsoa_to_ward, build_ward_index
+from geometry import load_geojson
 
 # ─── Paths ────────────────────────────────────────────────────────────────────
 
@@ -53,49 +69,79 @@ MID_LSOA_PATH    = os.path.join(DATA_DIR, "Mid-2021-LSOA-2021.csv")
 MODEL_PATH = os.path.join(MODEL_DIR, "xgb_burglary_model.pkl")
 SCALER_PATH = os.path.join(MODEL_DIR, "robust_scaler.pkl")
 
-# get model and scaler
-model = joblib.load(MODEL_PATH)
-scaler = joblib.load(SCALER_PATH)
+# ─── Cached data readers (parsed once, re-read when the file changes) ─────────
+# Every worker process re-reads a file once its mtime/size stamp changes, so a
+# model retrained or data uploaded in one worker is picked up by all of them.
+def load_model():
+    return store.get(MODEL_PATH, joblib.load)
 
-# ─── 1) Read both GeoJSONs into Python dicts ─────────────────────────────────
+def load_scaler():
+    return store.get(SCALER_PATH, joblib.load)
 
-ward_gdf = gpd.read_file(WARD_GEOJSON).to_crs(epsg=4326)
-# convert back to GeoJSON dict for Plotly
-ward_geo = json.loads(ward_gdf.to_json())
+def read_master(path=MASTER_CSV_PATH):
+    return apply_dtype_policy(
+        pd.read_csv(path, usecols=["lsoa_code", "month", "burglary_count"], parse_dates=["month"])
+    )
 
-# ─── Read & reproject LSOA boundaries into EPSG:4326 ────────────────────────
-lsoa_gdf = gpd.read_file(LSOA_GEOJSON).to_crs(epsg=4326)
-lsoa_geo = json.loads(lsoa_gdf.to_json())
+def load_forecast():
+    return store.get(PRED_CSV_PATH, pd.read_csv)
 
+def load_forecast_normalized():
+    return store.get(PRED_CSV_NORM_PATH, pd.read_csv)
 
-print("── Sample ward_geo.properties keys:", ward_geo["features"][0]["properties"].keys())
-print("── Sample ward_geo.properties (first feature):", ward_geo["features"][0]["properties"])
+def load_perception():
+    return store.get(PERC_CSV_NORM_PATH, pd.read_csv)
+
+def load_cubes():
+    """Prefix-sum cubes of burglary counts (LSOA and ward × month) for the master data.
 
-lsoa_to_ward = {}
+    Built once per master version by whichever worker asks first and
+    memory-mapped from data/cache/shared by all of them.
+    """
+    return store.get(MASTER_CSV_PATH, lambda p: shared_cubes(
+        p, lambda: build_cubes(read_master(p), lsoa_to_ward)
+    ), name="cubes")
 
-# First, build a list of (ward_code, shapely_polygon) for all wards
-ward_polygons = [
-    (
-        feat["properties"]["GSS_Code"],
-        shape(feat["geometry"])
+def past_range_props():
+    """min, max, marks and default value of the month-granular past-range slider."""
+    first, last = month_bounds(load_cubes()["lsoa"])
+    marks = {m: month_label(m)[:4] for m in range(first, last + 1) if m % 12 == 0}
+    return first, last, marks, [first, last]
+
+# Rendered map outputs, keyed by view + data/model version
+figure_cache = FigureCache(max_bytes=64 * 1024 * 1024)
+
+def map_data_version():
+    """Changes whenever a file behind the maps or the model is rewritten."""
+    return store.version(
+        MASTER_CSV_PATH, PRED_CSV_PATH, PRED_CSV_NORM_PATH, PERC_CSV_NORM_PATH,
+        SCHEDULE_CSV,
+        MODEL_PATH,
     )
-    for feat in ward_geo["features"]
-]
 
-# Now, for each LSOA, find its centroid and test which ward polygon contains it
-for feat in lsoa_geo["features"]:
-    lsoa_code = feat["properties"]["LSOA11CD"]
-    lsoa_centroid = shape(feat["geometry"]).centroid
+# ─── 1) Read both GeoJSONs into Python dicts ─────────────────────────────────
+
+# GeoJSON dicts for Plotly: simplified/rounded London-wide versions for the
+# city maps, a finer LSOA version for ward drill-down (cached in data/cache/geo;
+# the raw boundary files are only parsed when that cache is stale)
+ward_geo = load_geojson("ward", WARD_GEOJSON, "london")
+lsoa_geo = load_geojson("lsoa", LSOA_GEOJSON, "london")
+lsoa_geo_detail = load_geojson("lsoa", LSOA_GEOJSON, "ward")
+
+
+print("── Sample ward_geo.properties keys:", ward_geo["features"][0]["properties"].keys())
+print("── Sample ward_geo.properties (first feature):", ward_geo["features"][0]["properties"])
 
-    # Look for the ward that contains this centroid
-    for ward_code, ward_poly in ward_polygons:
-        if ward_poly.contains(lsoa_centroid):
-            lsoa_to_ward[lsoa_code] = ward_code
-            break
+# LSOA centroid → containing ward, via an STRtree query; the result is kept
+# in data/cache and reused until one of the GeoJSON files changes
+lsoa_to_ward = load_lsoa_to_ward(LSOA_GEOJSON, WARD_GEOJSON)
 
 # (Optional debug print: how many LSOAs mapped successfully)
 print(f"▶ Precomputed mapping for {len(lsoa_to_ward)} LSOAs → ward codes.")
 
+# ward code → LSOA codes / LSOA FeatureCollection / bounds / center for drill-down
+ward_index = build_ward_index(ward_geo, lsoa_geo_detail, lsoa_to_ward)
+
 
 # ─── 3) Build a ward_code ⇄ ward_name dictionary (for “search by name”) ─────
 ward_mapping = {
@@ -104,6 +150,9 @@ ward_mapping = {
 }
 name_to_code = {name.lower(): code for code, name in ward_mapping.items()}
 
+# past-range slider over month indices (year * 12 + month - 1) of the master data
+PAST_RANGE = past_range_props()
+
 
 # ─── 4) Start Dash App ──────────────────────────────────────────────────────
 server = Flask(__name__)
@@ -114,21 +163,63 @@ app = dash.Dash(
     requests_pathname_prefix='/police-dashboard/'
 )
 
+# Latency / payload histograms of every route and callback, cache hit rates
+# and the recent slow requests: /metrics (Prometheus text), /metrics/slow
+instrument(server, app)
+metrics.register_cache("figure", lambda: (figure_cache.hits, figure_cache.misses))
+metrics.register_cache("data_store", lambda: (store.hits, store.misses))
+# the two halves of a forecast run, timed on their own
+save_prediction = timed()(save_prediction)
+write_schedules = timed()(write_schedules)
+
+# Static files and data go out precompressed (gzip/brotli) with strong ETags,
+# so repeat visits get 304s instead of the full download
 @server.route("/")
 def server_index():
-    return send_from_directory(COMMUNITY_DIR, "index.html")
+    return send_cached(COMMUNITY_DIR, "index.html", cache_control=DATA_CACHE)
 
 @server.route('/<path:path>')
 def serve_community_static(path):
-    return send_from_directory(COMMUNITY_DIR, path)
+    return send_cached(COMMUNITY_DIR, path)
 
 @server.route("/police-dashboard/api/crime-data")
 def crime_data():
-    return send_from_directory(DATA_DIR, "crime_fixed_data.csv")
+    return send_cached(DATA_DIR, "crime_fixed_data.csv", cache_control=DATA_CACHE)
+
+# All-wards patrol schedule as it is on disk (404 until one was generated)
+SCHEDULE_ROUTE = "/police-dashboard/api/schedule"
+
+@server.route(SCHEDULE_ROUTE)
+def schedule_csv():
+    return send_cached(os.path.dirname(SCHEDULE_CSV), os.path.basename(SCHEDULE_CSV),
+                       cache_control=DATA_CACHE, download_name="All_wards_patrol_schedule.csv")
 
 @server.route("/police-dashboard/api/lookup")
 def lookup():
-    return send_from_directory(DATA_DIR, "lsoa_to_ward.json")
+    return send_cached(DATA_DIR, "lsoa_to_ward.json", cache_control=DATA_CACHE)
+
+# Ward series / London mean / LSOA ranking for the community charts, rebuilt
+# the first time it is asked for after the master data or lookup changed
+@server.route("/police-dashboard/api/community")
+def community_data():
+    path = ensure_community_aggregates()
+    return send_cached(os.path.dirname(path), os.path.basename(path), cache_control=DATA_CACHE)
+
+# Filtered, paginated monthly counts: ?level=lsoa|ward&start=YYYY-MM&end=YYYY-MM
+# &codes=...&columns=...&page=1&limit=1000&format=json|arrow
+@server.route("/police-dashboard/api/query")
+def query_crime_data():
+    try:
+        columns, meta = run_query(load_cubes(), lsoa_to_ward, request.args)
+    except QueryError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if request.args.get("format", "json") == "arrow":
+        response = Response(to_arrow(columns, meta), mimetype="application/vnd.apache.arrow.stream")
+    else:
+        response = jsonify(to_json(columns, meta))
+    response.headers["Cache-Control"] = DATA_CACHE
+    return response
 
 # CSS styles
 SIDEBAR_STYLE = {
@@ -149,6 +240,7 @@ app.layout = html.Div([
     dcc.Store(id="selected-ward", data=None),
     dcc.Store(id="sidebar-open", data=True),
     dcc.Store(id="show-perception", data=False),
+    dcc.Store(id="map-geometry", data={}),  # graph id → geometry it currently shows
 
     # ── Toggle filters button ─────────────────────────────────────────────────
     html.Button(
@@ -174,6 +266,7 @@ app.layout = html.Div([
                     {"label": "Past Data",      "value": "past"},
                     {"label": "Predicted Data", "value": "pred"},
                     {"label": "Predicted vs Perceived", "value": "pred_vs_perceived"},
+                    {"label": "Monthly Playback", "value": "playback"},
                 ],
                 value="past",
                 labelStyle={"display": "block"}
@@ -200,12 +293,13 @@ app.layout = html.Div([
                     html.Label("Date Range"),
                     dcc.RangeSlider(
                         id="past-range",
-                        min=2021,
-                        max=2025,
+                        min=PAST_RANGE[0],
+                        max=PAST_RANGE[1],
                         step=1,
-                        marks={y: str(y) for y in range(2021, 2026)},
-                        value=[2021, 2025]
+                        marks=PAST_RANGE[2],
+                        value=PAST_RANGE[3]
                     ),
+                    html.Div(id="past-range-label", style={"fontSize": "12px"}),
                 ]
             ),
 
@@ -239,11 +333,17 @@ app.layout = html.Div([
                         style={"width": "100%", "background-color": "#007bff", "color": "white"}
                     ),
                     html.Br(), html.Br(),
-                    html.Button(
-                        "Download Schedule CSV",
-                        id="Schedule Button",
-                        n_clicks=0,
-                        style={"width": "100%"}
+                    # all wards: a plain link to the schedule route, so the browser
+                    # streams the file; one ward: built by download_schedule
+                    html.A(
+                        html.Button(
+                            "Download Schedule CSV",
+                            id="Schedule Button",
+                            n_clicks=0,
+                            style={"width": "100%"}
+                        ),
+                        id="schedule-link",
+                        href=SCHEDULE_ROUTE,
                     ),
                     dcc.Download(id="download-schedule"),
                 ],
@@ -318,6 +418,10 @@ app.layout = html.Div([
             html.Div(
                 id="allocation-table-container",
                 style={"margin-top": "20px"}
+            ),
+            html.Div(
+                id="drivers-container",
+                style={"margin-top": "20px"}
             )
         ]
     ),
@@ -359,7 +463,7 @@ app.layout = html.Div([
     Input("data-mode", "value")
 )
 def toggle_mode_controls(mode):
-    if mode == "past":
+    if mode in ("past", "playback"):
         return {}, {"display": "none"}, {"display": "none"}
     elif mode == "pred":
         return {"display": "none"}, {}, {"display": "none"}
@@ -370,6 +474,26 @@ def toggle_mode_controls(mode):
     return {}, {"display": "none"}, {"display": "none"}
 
 
+# Month labels for the past-range slider, which works on month indices
+@app.callback(
+    Output("past-range-label", "children"),
+    Input("past-range", "value"),
+)
+def show_past_range(past_range):
+    return f"{month_label(past_range[0])} – {month_label(past_range[1])}"
+
+# Extend the slider when an upload adds months to the master data
+@app.callback(
+    Output("past-range", "min"),
+    Output("past-range", "max"),
+    Output("past-range", "marks"),
+    Input("upload-status", "children"),
+    prevent_initial_call=True,
+)
+def refresh_past_range(_status):
+    first, last, marks, _ = past_range_props()
+    return first, last, marks
+
 # 5.2) Handle upload of a new monthly CSV (just append raw rows)
 @app.callback(
     Output("upload-file", "children"),
@@ -392,41 +516,52 @@ def handle_upload(contents, filename):
         clean_df = clean_new_dataset(df_new)
         print("clean_df created")
         
-        # Append to master CSV
-        if not os.path.exists(MASTER_CSV_PATH):
-            return html.Div(f"Master CSV not found at {MASTER_CSV_PATH}."), None, ""
-        
-        df_master = pd.read_csv(MASTER_CSV_PATH)
-        clean_df = clean_df[df_master.columns]
-        
-        print("Difference: ", set(df_master.columns) - set(clean_df.columns))
-        if sorted(df_master.columns) != sorted(clean_df.columns):
-            return html.Div("Uploaded CSV columns do not match master CSV columns."), None, ""
-
-        # Ensure no duplicates
-        clean_df["month"] = pd.to_datetime(clean_df["month"])
-        df_master["month"] = pd.to_datetime(df_master["month"])
-
-        prev_len_clean = len(clean_df)
-
-        # Remove rows from clean_df that already exist in df_master (by lsoa_code + month)
-        existing_index = df_master.set_index(["lsoa_code", "month"]).index
-        clean_df = clean_df[~clean_df.set_index(["lsoa_code", "month"]).index.isin(existing_index)]
-        # print if any rows were removed
-        if len(clean_df) < prev_len_clean:
-            return html.Div("Data already exists, no new rows added."), None, ""
-        
-        update_model_with_new_data(clean_df)
-        print("model updated")
-        df_master = pd.concat([df_master, clean_df], ignore_index=True)
-        df_master.to_csv(MASTER_CSV_PATH, index=False, mode='w')
-
-        return html.Div("New data uploaded successfully."), None, ""
+        # Append to master CSV. Everything from the duplicate check to the
+        # rewrite runs under the write lock, so two uploads cannot both pass
+        # the check against the same master and overwrite each other.
+        with WRITE_LOCK.acquire(timeout=REQUEST_LOCK_TIMEOUT):
+            return append_upload(clean_df)
+    except Timeout:
+        return html.Div("Another upload or prediction is still running, please try again shortly."), None, ""
     except Exception as e:
         print("Error details:", e)
         traceback.print_exc()
         return html.Div("Error: could not read uploaded CSV."), None, ""
 
+@timed()
+def append_upload(clean_df):
+    """Validate `clean_df` against the master, refit the model and append it. Caller holds WRITE_LOCK."""
+    if not os.path.exists(MASTER_CSV_PATH):
+        return html.Div(f"Master CSV not found at {MASTER_CSV_PATH}."), None, ""
+    
+    df_master = pd.read_csv(MASTER_CSV_PATH)
+    clean_df = clean_df[df_master.columns]
+    
+    print("Difference: ", set(df_master.columns) - set(clean_df.columns))
+    if sorted(df_master.columns) != sorted(clean_df.columns):
+        return html.Div("Uploaded CSV columns do not match master CSV columns."), None, ""
+
+    # Ensure no duplicates
+    clean_df["month"] = pd.to_datetime(clean_df["month"])
+    df_master["month"] = pd.to_datetime(df_master["month"])
+
+    prev_len_clean = len(clean_df)
+
+    # Remove rows from clean_df that already exist in df_master (by lsoa_code + month)
+    existing_index = df_master.set_index(["lsoa_code", "month"]).index
+    clean_df = clean_df[~clean_df.set_index(["lsoa_code", "month"]).index.isin(existing_index)]
+    # print if any rows were removed
+    if len(clean_df) < prev_len_clean:
+        return html.Div("Data already exists, no new rows added."), None, ""
+    
+    update_model_with_new_data(clean_df)
+    print("model updated")
+    df_master = pd.concat([df_master, clean_df], ignore_index=True)
+    atomic_write(MASTER_CSV_PATH, df_master.to_csv, index=False)
+    store.invalidate(MASTER_CSV_PATH)
+
+    return html.Div("New data uploaded successfully."), None, ""
+
 @app.callback(
     Output("sidebar", "style"),
     Output("page-content", "style"),
@@ -525,7 +660,15 @@ def predict_month(n_clicks):
     try:
         month = (pd.Timestamp.now() + pd.DateOffset(months=1)).strftime("%Y-%m-%d")
         print("Predicting for month:", month)
-        save_prediction(model, scaler, month)
+        # forecast, contributions and the patrol plan built from them are
+        # written together; one run at a time
+        with WRITE_LOCK.acquire(timeout=REQUEST_LOCK_TIMEOUT):
+            save_prediction(load_model(), load_scaler(), month)
+            write_schedules(workers=1)  # no process pool inside a web worker
+        store.invalidate(PRED_CSV_PATH)
+        return 0
+    except Timeout:
+        print("Prediction skipped: another upload or prediction is still running, please try again shortly.")
         return 0
     except Exception as e:
         print("Prediction error:", e)
@@ -555,14 +698,16 @@ def perception_callback(n_clicks, show_perc):
     Output("map-ward", "style"),
     Output("map-lsoa", "style"),
     Output("allocation-table-container", "children"),
+    Output("map-geometry", "data"),
     Input("apply-button", "n_clicks"),
     Input("predict-button", "n_clicks"),
     Input("data-mode", "value"),
     Input("selected-ward", "data"),
     State("level", "value"),
     State("past-range", "value"),
+    State("map-geometry", "data"),
 )
-def unified_map_callback(apply_clicks, predict_clicks, mode, selected_ward, level, past_range):
+def unified_map_callback(apply_clicks, predict_clicks, mode, selected_ward, level, past_range, shown):
     ctx = dash.callback_context
     if not ctx.triggered:
         raise PreventUpdate
@@ -570,18 +715,84 @@ def unified_map_callback(apply_clicks, predict_clicks, mode, selected_ward, leve
     trigger_id = ctx.triggered[0]["prop_id"].split(".")[0]
 
     if mode == "past" and trigger_id in ["apply-button", "data-mode", "selected-ward"]:
-        return generate_map("past", selected_ward, level, past_range)
+        outputs = generate_map("past", selected_ward, level, past_range)
+    elif mode == "pred" and trigger_id in ["data-mode", "predict-button", "selected-ward"]:
+        outputs = generate_map("pred", selected_ward, level)
+    elif mode == "pred_vs_perceived":
+        outputs = generate_map("pred_vs_perceived", selected_ward, level)
+    elif mode == "playback" and trigger_id in ["apply-button", "data-mode"]:
+        outputs = generate_map("playback", None, level, past_range)
+    else:
+        raise PreventUpdate
 
-    if mode == "pred" and trigger_id in ["data-mode", "predict-button", "selected-ward"]:
-        return generate_map("pred", selected_ward, level)
-    
-    if mode == "pred_vs_perceived":
-        return generate_map("pred_vs_perceived", selected_ward, level)
+    ward_fig, lsoa_fig, ward_style, lsoa_style, alloc = outputs
+    shown = shown or {}
+    ward_out, ward_geom = figure_update(ward_fig, shown.get("map-ward"))
+    lsoa_out, lsoa_geom = figure_update(lsoa_fig, shown.get("map-lsoa"))
+    return ward_out, lsoa_out, ward_style, lsoa_style, alloc, {"map-ward": ward_geom, "map-lsoa": lsoa_geom}
+
+def figure_update(fig, shown_geometry):
+    """Full figure, or a Patch of the values only when the graph already has this geometry.
+
+    Returns (output, geometry). With the same geometry on screen only the
+    locations, z values, hover text, marker and colour axis are sent, not the GeoJSON.
+    """
+    fig = fig if isinstance(fig, dict) else fig.to_dict()
+    if fig.get("frames"):
+        # animations carry frames/sliders a Patch would leave behind: always send
+        # them whole, and send whatever follows them whole too
+        return fig, None
+    geometry = fig["layout"].get("meta", {}).get("geometry")
+    if geometry is None or geometry != shown_geometry:
+        return fig, geometry
+
+    trace = fig["data"][0]
+    patch = dash.Patch()
+    patch["data"][0]["locations"] = trace.get("locations")
+    patch["data"][0]["z"] = trace.get("z")
+    patch["data"][0]["hovertemplate"] = trace.get("hovertemplate")
+    patch["data"][0]["marker"] = trace.get("marker")
+    patch["layout"]["coloraxis"] = fig["layout"].get("coloraxis")
+    return patch, geometry
+
+# Top prediction drivers for the selected ward, or for a clicked LSOA inside it
+@app.callback(
+    Output("drivers-container", "children"),
+    Input("map-lsoa", "clickData"),
+    Input("selected-ward", "data"),
+    Input("data-mode", "value"),
+)
+def show_drivers(lsoa_click, selected_ward, mode):
+    if mode != "pred" or not isinstance(selected_ward, dict) or selected_ward.get("mode") != mode:
+        return html.Div()
 
-    raise PreventUpdate
+    ctx = dash.callback_context
+    triggered = ctx.triggered[0]["prop_id"].split(".")[0] if ctx.triggered else None
+
+    if triggered == "map-lsoa" and lsoa_click:
+        codes = [lsoa_click["points"][0]["location"]]
+        title = f"Top drivers for LSOA {codes[0]}"
+    else:
+        ward_code = selected_ward["code"]
+        codes = ward_index[ward_code].lsoa_codes
+        title = f"Top drivers for {ward_mapping.get(ward_code, ward_code)}"
+
+    drivers = top_drivers(codes)
+    if drivers.empty:
+        return html.Div("No explanations available yet, run a prediction first.")
+
+    return html.Div([
+        html.H4(title),
+        dash_table.DataTable(
+            data=drivers.to_dict("records"),
+            columns=[{"name": "Feature", "id": "feature"},
+                     {"name": "Contribution", "id": "contribution"}],
+            style_cell={"padding": "4px", "textAlign": "left"}
+        )
+    ])
 
 def build_perception_figure():
-    sentiment_summary = pd.read_csv(os.path.join(DATA_DIR, "topic_sentiment_summary.csv"))
+    sentiment_summary = store.get(os.path.join(DATA_DIR, "topic_sentiment_summary.csv"), pd.read_csv)
     
     topic_sentiment = (
         sentiment_summary.groupby('matched_topics')
@@ -610,6 +821,7 @@ def build_perception_figure():
     return fig
 
 
+@timed()
 def update_model_with_new_data(new_df: pd.DataFrame):
     exclude_cols = {
         "lsoa_code", "month", "year_month", "crime_type",
@@ -622,15 +834,65 @@ def update_model_with_new_data(new_df: pd.DataFrame):
     features = [c for c in new_df.columns if c not in exclude_cols]
     target_col = "burglary_count"
     
+    scaler = load_scaler()
     trained_features = scaler.feature_names_in_.tolist()
     X_sorted_cols = new_df[trained_features]
 
-    X_new = scaler.transform(X_sorted_cols)
-    y_new = new_df[target_col].values
+    X_new = scaler.transform(X_sorted_cols).astype(np.float32)
+    y_new = new_df[target_col].to_numpy(dtype=np.float32)
+    # train a private copy and swap the file in atomically; the other workers
+    # load the new model on their next request through the store
+    model = joblib.load(MODEL_PATH)
     model.fit(X_new, y_new, xgb_model=model)
-    joblib.dump(model, MODEL_PATH)
+    atomic_write(MODEL_PATH, lambda p: joblib.dump(model, p))
+    store.invalidate(MODEL_PATH)
     print(f"Model updated and saved to {MODEL_PATH}")
 
+@timed()
+def stop_search_features() -> pd.DataFrame:
+    """Stop-and-search, weapon and drug search counts per (lsoa_code, month).
+
+    The point-in-polygon join against every LSOA is the slow part of an
+    upload, and its inputs are static, so the result lives in the feature
+    cache and is only rebuilt when the CSV or the LSOA boundaries change.
+    """
+    def build() -> FeatureSet:
+        # Load and clean stop and search data
+        stop_and_search_data = pd.read_csv(STOP_SEARCH_PATH, skiprows=2, on_bad_lines='skip', engine="python")
+        stop_and_search_data.columns = stop_and_search_data.columns.str.strip().str.lower().str.replace(" ", "_").str.replace(r"[^\w_]", "", regex=True)
+        stop_and_search_data["date"] = pd.to_datetime(stop_and_search_data["date"], errors="coerce")
+        stop_and_search_data.dropna(subset=["date", "longitude", "latitude"], inplace=True)
+        stop_and_search_data["month"] = stop_and_search_data["date"].dt.to_period("M").dt.to_timestamp()
+
+        # Attach LSOA to stop and search
+        lsoa_gdf = gpd.read_file(LSOA_GEOJSON)
+        stop_and_search_data["geometry"] = stop_and_search_data.apply(lambda row: Point(row["longitude"], row["latitude"]), axis=1)
+        stop_gdf = gpd.GeoDataFrame(stop_and_search_data, geometry="geometry", crs="EPSG:4326").to_crs(lsoa_gdf.crs)
+        stop_with_lsoa = gpd.sjoin(stop_gdf, lsoa_gdf[["LSOA11CD", "geometry"]], how="left", predicate="within")
+        stop_with_lsoa.rename(columns={"LSOA11CD": "lsoa_code"}, inplace=True)
+
+        # Aggregate stop and search, plus object of search
+        stop_with_lsoa["object_of_search"] = stop_with_lsoa["object_of_search"].str.lower()
+        keys = ["lsoa_code", "month"]
+        counts = pd.concat([
+            stop_with_lsoa.dropna(subset=["lsoa_code"]).groupby(keys).size().rename("stop_and_search_count"),
+            stop_with_lsoa[stop_with_lsoa["object_of_search"].str.contains("weapon", na=False)].groupby(keys).size().rename("weapon_search_count"),
+            stop_with_lsoa[stop_with_lsoa["object_of_search"].str.contains("drug", na=False)].groupby(keys).size().rename("drug_search_count"),
+        ], axis=1).fillna(0).reset_index()
+
+        names = ["stop_and_search_count", "weapon_search_count", "drug_search_count"]
+        return FeatureSet(
+            X=counts[names].to_numpy(dtype=np.float32), y=None,
+            lsoa_code=counts["lsoa_code"].to_numpy(), month=counts["month"].to_numpy(),
+            features=names, extras={},
+        )
+
+    fs = cached_features("stop_search", [STOP_SEARCH_PATH, LSOA_GEOJSON], [build], build)
+    out = pd.DataFrame(np.asarray(fs.X), columns=fs.features)
+    out.insert(0, "lsoa_code", np.asarray(fs.lsoa_code).astype(object))
+    out.insert(1, "month", pd.to_datetime(np.asarray(fs.month)))
+    return out
+
 def clean_new_dataset(df: pd.DataFrame) -> pd.DataFrame:
     df.columns = (
         df.columns
@@ -643,23 +905,6 @@ def clean_new_dataset(df: pd.DataFrame) -> pd.DataFrame:
     df = df[df["lsoa_code"].astype(str).str.startswith("E01")]
     # print("Filtered to London LSOAs:", df["lsoa_code"].nunique(), "unique LSOAs remaining")
 
-    # Load and clean stop and search data
-    stop_and_search_data = pd.read_csv(STOP_SEARCH_PATH, skiprows=2, on_bad_lines='skip', engine="python")
-    stop_and_search_data.columns = stop_and_search_data.columns.str.strip().str.lower().str.replace(" ", "_").str.replace(r"[^\w_]", "", regex=True)
-    stop_and_search_data["date"] = pd.to_datetime(stop_and_search_data["date"], errors="coerce")
-    stop_and_search_data.dropna(subset=["date", "longitude", "latitude"], inplace=True)
-    stop_and_search_data["month"] = stop_and_search_data["date"].dt.to_period("M").dt.to_timestamp()
-
-    # Attach LSOA to stop and search
-    lsoa_gdf = gpd.read_file(LSOA_GEOJSON)
-    stop_and_search_data["geometry"] = stop_and_search_data.apply(lambda row: Point(row["longitude"], row["latitude"]), axis=1)
-    stop_gdf = gpd.GeoDataFrame(stop_and_search_data, geometry="geometry", crs="EPSG:4326").to_crs(lsoa_gdf.crs)
-    stop_with_lsoa = gpd.sjoin(stop_gdf, lsoa_gdf[["LSOA11CD", "geometry"]], how="left", predicate="within")
-    stop_with_lsoa.rename(columns={"LSOA11CD": "lsoa_code"}, inplace=True)
-
-    # Aggregate stop and search
-    stop_search_counts = stop_with_lsoa.dropna(subset=["lsoa_code"]).groupby(["lsoa_code", "month"]).size().reset_index(name="stop_and_search_count")
-
     # Clean and process crime data
     df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_").str.replace(r"[^\w_]", "", regex=True)
     df.drop(columns=["reported_by", "falls_within", "context"], errors='ignore', inplace=True)
@@ -700,9 +945,10 @@ def clean_new_dataset(df: pd.DataFrame) -> pd.DataFrame:
     lsoa_coords = df.dropna(subset=["longitude", "latitude"]).groupby("lsoa_code")[["longitude", "latitude"]].mean().reset_index()
     full_df = full_df.merge(lsoa_coords, on="lsoa_code", how="left")
 
-    # Merge stop and search
-    full_df = full_df.merge(stop_search_counts, on=["lsoa_code", "month"], how="left")
+    # Merge stop and search (cached, only rebuilt when the source files change)
+    full_df = full_df.merge(stop_search_features(), on=["lsoa_code", "month"], how="left")
     full_df["stop_and_search_count"] = full_df["stop_and_search_count"].fillna(0)
+    full_df[["weapon_search_count", "drug_search_count"]] = full_df[["weapon_search_count", "drug_search_count"]].fillna(0).astype(int)
 
     # Lags and rolling stats
     full_df.sort_values(["lsoa_code", "month"], inplace=True)
@@ -747,14 +993,6 @@ def clean_new_dataset(df: pd.DataFrame) -> pd.DataFrame:
     fill_cols = [c for c in full_df.columns if c.startswith(("lag_", "rolling_", "delta_", "momentum"))]
     full_df[fill_cols] = full_df[fill_cols].fillna(0)
 
-    # Object of search feature engineering
-    stop_with_lsoa["object_of_search"] = stop_with_lsoa["object_of_search"].str.lower()
-    weapon_counts = stop_with_lsoa[stop_with_lsoa["object_of_search"].str.contains("weapon", na=False)].groupby(["lsoa_code", "month"]).size().reset_index(name="weapon_search_count")
-    drug_counts = stop_with_lsoa[stop_with_lsoa["object_of_search"].str.contains("drug", na=False)].groupby(["lsoa_code", "month"]).size().reset_index(name="drug_search_count")
-    full_df = full_df.merge(weapon_counts, on=["lsoa_code", "month"], how="left")
-    full_df = full_df.merge(drug_counts, on=["lsoa_code", "month"], how="left")
-    full_df[["weapon_search_count", "drug_search_count"]] = full_df[["weapon_search_count", "drug_search_count"]].fillna(0).astype(int)
-
     # Drop unnecessary columns
     # full_df.drop(columns=[col for col in full_df.columns if "rolling_sum_" in col] + ["month_num"], inplace=True, errors="ignore")
 
@@ -835,8 +1073,111 @@ def clean_new_dataset(df: pd.DataFrame) -> pd.DataFrame:
 
     return full_df
 
+def _geometry(geometry):
+    """(GeoJSON, featureidkey) for "ward", "lsoa" or "ward:<code>"."""
+    if geometry == "ward":
+        return ward_geo, "properties.GSS_Code"
+    if geometry == "lsoa":
+        return lsoa_geo, "properties.LSOA11CD"
+    return ward_index[geometry.split(":", 1)[1]].geojson, "properties.LSOA11CD"
+
+def _choropleth(df, geometry, **kwargs):
+    """Choropleth of df.code → df.count over one of the app's geometries.
+
+    `geometry` is "ward", "lsoa" or "ward:<code>" (the LSOAs of one ward). It
+    is recorded in layout.meta so callbacks can tell whether a graph already
+    holds this geometry and only needs new values.
+    """
+    geojson, key = _geometry(geometry)
+    fig = px.choropleth_map(
+        df, geojson=geojson, featureidkey=key,
+        locations="code", color="count",
+        map_style="open-street-map", **kwargs
+    )
+    fig.update_layout(margin={"r":0,"t":0,"l":0,"b":0}, meta={"geometry": geometry})
+    return fig
+
+def _playback_figure(cube, geometry, m0, m1):
+    """Animated choropleth with one frame per month in [m0, m1].
+
+    All months come out of the prefix-sum cube in one np.diff. The geometry
+    sits once in the base trace; each frame only carries that month's z
+    values, and the play button / slider animate them in the browser.
+    """
+    first, last = month_bounds(cube)
+    m0, m1 = max(int(m0), first), min(int(m1), last)
+    monthly = np.diff(cube.cum, axis=1)[:, m0 - first:m1 - first + 1]
+    codes = list(cube.codes)
+
+    if geometry == "ward":
+        # every ward gets a value, wards without LSOA data stay at 0
+        all_w = [f["properties"]["GSS_Code"] for f in ward_geo["features"]]
+        pos = {c: i for i, c in enumerate(all_w)}
+        full = np.zeros((len(all_w), monthly.shape[1]), dtype=monthly.dtype)
+        full[[pos[c] for c in codes]] = monthly
+        codes, monthly = all_w, full
+
+    labels = [month_label(m) for m in range(m0, m1 + 1)]
+    geojson, key = _geometry(geometry)
+    fig = go.Figure(
+        data=[go.Choroplethmap(
+            geojson=geojson, featureidkey=key, locations=codes, z=monthly[:, 0],
+            zmin=0, zmax=max(int(monthly.max()), 1), colorscale="oryel",
+            marker_opacity=0.7, colorbar_title="Burglary Count",
+            hovertemplate="%{location}<br>Burglary Count=%{z}<extra></extra>",
+        )],
+        frames=[
+            go.Frame(name=label, data=[go.Choroplethmap(z=monthly[:, i])], traces=[0])
+            for i, label in enumerate(labels)
+        ],
+    )
+    fig.update_layout(
+        map_style="open-street-map",
+        map_center={"lat":51.5074,"lon":-0.1278}, map_zoom=10,
+        margin={"r":0,"t":0,"l":0,"b":0},
+        meta={"geometry": geometry},
+        updatemenus=[{
+            "type": "buttons", "showactive": False,
+            "x": 0.02, "y": 0.02, "xanchor": "left", "yanchor": "bottom",
+            "buttons": [
+                {"label": "▶ Play", "method": "animate",
+                 "args": [None, {"frame": {"duration": 600, "redraw": True},
+                                 "fromcurrent": True, "transition": {"duration": 0}}]},
+                {"label": "❚❚ Pause", "method": "animate",
+                 "args": [[None], {"frame": {"duration": 0, "redraw": False},
+                                   "mode": "immediate", "transition": {"duration": 0}}]},
+            ],
+        }],
+        sliders=[{
+            "active": 0, "x": 0.15, "len": 0.8, "y": 0.02, "yanchor": "bottom",
+            "currentvalue": {"prefix": "Month: "},
+            "steps": [
+                {"label": label, "method": "animate",
+                 "args": [[label], {"mode": "immediate", "frame": {"duration": 0, "redraw": True},
+                                    "transition": {"duration": 0}}]}
+                for label in labels
+            ],
+        }],
+    )
+    return fig
+
 def generate_map(mode, selected_ward, level, past_range=None):
-    df = pd.read_csv(MASTER_CSV_PATH, parse_dates=["month"])
+    """Map outputs for a view, served from the figure cache when possible."""
+    if isinstance(selected_ward, dict):
+        selected_code = selected_ward.get("code") if selected_ward.get("mode") == mode else None
+    else:
+        selected_code = selected_ward
+    key = (
+        mode, level,
+        tuple(past_range) if mode in ("past", "playback") and past_range else None,
+        selected_code,
+        map_data_version(),
+    )
+    return figure_cache.get_or_build(key, lambda: build_map(mode, selected_ward, level, past_range))
+
+@timed()
+def build_map(mode, selected_ward, level, past_range=None):
+    cubes = load_cubes()
 
     # resolve selected ward object
     if isinstance(selected_ward, dict):
@@ -848,29 +1189,31 @@ def generate_map(mode, selected_ward, level, past_range=None):
         selected_code = selected_ward
 
 
-    if mode == "past":
-        y0, y1 = int(past_range[0]), int(past_range[1])
-        df = df[(df.month.dt.year >= y0) & (df.month.dt.year <= y1)]
-
-    df = df[df.lsoa_code.isin(lsoa_to_ward)]
-    if df.empty:
-        blank = px.choropleth_map(
-            pd.DataFrame({"code":[], "count":[]}),
-            geojson=ward_geo, featureidkey="properties.GSS_Code",
-            locations="code", color="count",
-            map_style="open-street-map",
+    first, last = month_bounds(cubes["lsoa"])
+    if mode in ("past", "playback"):
+        m0, m1 = int(past_range[0]), int(past_range[1])
+    else:
+        m0, m1 = first, last
+    if len(cubes["lsoa"].codes) == 0 or m1 < first or m0 > last:
+        blank = _choropleth(
+            pd.DataFrame({"code":[], "count":[]}), "ward",
             center={"lat":51.5074,"lon":-0.1278}, zoom=10
         )
-        blank.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
         return blank, blank, FULL_MAP_STYLE, {"display":"none"}, html.Div()
 
+    if mode == "playback":
+        if level == "ward":
+            fig = _playback_figure(cubes["ward"], "ward", m0, m1)
+            return fig, fig, FULL_MAP_STYLE, {"display":"none"}, html.Div()
+        fig = _playback_figure(cubes["lsoa"], "lsoa", m0, m1)
+        return fig, fig, {"display":"none"}, FULL_MAP_STYLE, html.Div()
+
     if mode == "pred":
-        df_pred = pd.read_csv(PRED_CSV_PATH)
+        df_pred = load_forecast()
 
         if level == "ward":
-            df_pred["ward_code"] = df_pred.lsoa_code.map(lsoa_to_ward)
             wc = (
-                df_pred.groupby("ward_code")["predicted_burglary"]
+                df_pred.groupby(df_pred.lsoa_code.map(lsoa_to_ward).rename("ward_code"))["predicted_burglary"]
                 .sum().reset_index(name="count")
             )
             all_w = [f["properties"]["GSS_Code"] for f in ward_geo["features"]]
@@ -879,52 +1222,34 @@ def generate_map(mode, selected_ward, level, past_range=None):
             )
             dfw["count"] = dfw["count"].fillna(0).astype(int)
 
-            ward_fig = px.choropleth_map(
-                dfw, geojson=ward_geo, featureidkey="properties.GSS_Code",
-                locations="code", color="count",
+            ward_fig = _choropleth(
+                dfw, "ward",
                 color_continuous_scale="oryel", opacity=0.7,
-                map_style="open-street-map",
                 center={"lat":51.5074, "lon":-0.1278}, zoom=10,
                 labels={"count":"Predicted Burglaries"},
             )
-            ward_fig.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
 
             if not selected_code:
                 return ward_fig, ward_fig, FULL_MAP_STYLE, {"display":"none"}, html.Div()
 
         # if selected
-        ward_geom = next(
-            f["geometry"] for f in ward_geo["features"]
-            if f["properties"]["GSS_Code"] == selected_code
-        )
-        feats = [
-            f for f in lsoa_geo["features"]
-            if shape(ward_geom).contains(shape(f["geometry"]).centroid)
-        ]
-        geo_l = {"type":"FeatureCollection","features":feats}
-        lcodes = [f["properties"]["LSOA11CD"] for f in feats]
+        ward_entry = ward_index[selected_code]
         fl = (
-            df_pred[df_pred.lsoa_code.isin(lcodes)]
+            df_pred[df_pred.lsoa_code.isin(ward_entry.lsoa_codes)]
             .groupby("lsoa_code")["predicted_burglary"]
             .sum().reset_index(name="count")
         ).rename(columns={"lsoa_code":"code"})
 
-        minx, miny, maxx, maxy = shape(ward_geom).bounds
-        center_l = {"lat":(miny+maxy)/2, "lon":(minx+maxx)/2}
-
-        lsoa_fig = px.choropleth_map(
-            fl, geojson=geo_l, featureidkey="properties.LSOA11CD",
-            locations="code", color="count", opacity=0.7,
+        lsoa_fig = _choropleth(
+            fl, f"ward:{selected_code}",
+            opacity=0.7,
             color_continuous_scale="oryel",
-            map_style="open-street-map",
-            center=center_l, zoom=12,
+            center=ward_entry.center, zoom=12,
             labels={"count":"Burglary Count"},
         )
-        lsoa_fig.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
 
-        alloc_path = os.path.join(DATA_DIR, "allocations", f"All_wards_patrol_schedule.csv")
-        if os.path.exists(alloc_path):
-            df_alloc = get_ward_schedule(map_wards_function(selected_code))
+        df_alloc = ward_schedule(selected_code, ward_mapping)
+        if df_alloc is not None:
             alloc_table = dash_table.DataTable(
                 data=df_alloc.to_dict("records"),
                 columns=[{"name":c,"id":c} for c in df_alloc.columns],
@@ -943,8 +1268,8 @@ def generate_map(mode, selected_ward, level, past_range=None):
         )
         
     if mode == "pred_vs_perceived":
-        df_pred = pd.read_csv(PRED_CSV_NORM_PATH)
-        df_perc = pd.read_csv(PERC_CSV_NORM_PATH)
+        df_pred = load_forecast_normalized()
+        df_perc = load_perception()
 
         if "predicted_burglary_norm" not in df_pred.columns:
             raise ValueError("Missing 'predicted_burglary_norm' in predicted data.")
@@ -971,11 +1296,9 @@ def generate_map(mode, selected_ward, level, past_range=None):
             )
             dfw["count"] = dfw["count"].fillna(0)
 
-            fig = px.choropleth_map(
-                dfw, geojson=ward_geo, featureidkey="properties.GSS_Code",
-                locations="code", color="count",
+            fig = _choropleth(
+                dfw, "ward",
                 color_continuous_scale="RdBu", opacity=0.7,
-                map_style="open-street-map",
                 center={"lat": 51.5074, "lon": -0.1278}, zoom=10,
                 labels={"count": "Predicted - Perceived"},
             )
@@ -983,39 +1306,29 @@ def generate_map(mode, selected_ward, level, past_range=None):
         else:
             df_lsoa = df_merged[["lsoa_code", "gap"]].rename(columns={"lsoa_code": "code", "gap": "count"})
             
-            fig = px.choropleth_map(
-                df_lsoa, geojson=lsoa_geo, featureidkey="properties.LSOA11CD",
-                locations="code", color="count",
+            fig = _choropleth(
+                df_lsoa, "lsoa",
                 color_continuous_scale="RdBu", opacity=0.7,
-                map_style="open-street-map",
                 center={"lat": 51.5074, "lon": -0.1278}, zoom=10,
                 labels={"count": "Predicted - Perceived"},
             )
-        fig.update_layout(margin={"r": 0, "t": 0, "l": 0, "b": 0})
         return fig, fig, FULL_MAP_STYLE, {"display": "none"}, html.Div()
 
-    # ─────────────────────── Past mode
+    # ─────────────────────── Past mode (range totals from the prefix-sum cubes)
+    lsoa_totals = range_sum(cubes["lsoa"], m0, m1)
     if level == "ward":
-        df["ward_code"] = df.lsoa_code.map(lsoa_to_ward)
-        wc = (
-            df.groupby("ward_code")["burglary_count"]
-            .sum().reset_index(name="count")
-        )
+        wc = range_sum(cubes["ward"], m0, m1)
         all_w = [f["properties"]["GSS_Code"] for f in ward_geo["features"]]
-        dfw = pd.DataFrame({"code": all_w}).merge(
-            wc.rename(columns={"ward_code":"code"}), on="code", how="left"
-        )
+        dfw = pd.DataFrame({"code": all_w}).merge(wc, on="code", how="left")
         dfw["count"] = dfw["count"].fillna(0).astype(int)
 
-        ward_fig = px.choropleth_map(
-            dfw, geojson=ward_geo, featureidkey="properties.GSS_Code",
-            locations="code", color="count", opacity=0.7,
+        ward_fig = _choropleth(
+            dfw, "ward",
+            opacity=0.7,
             color_continuous_scale="oryel",
-            map_style="open-street-map",
             center={"lat":51.5074,"lon":-0.1278}, zoom=10,
             labels={"count":"Burglary Count"},
         )
-        ward_fig.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
 
         if not selected_code:
             return (
@@ -1026,34 +1339,16 @@ def generate_map(mode, selected_ward, level, past_range=None):
                 html.Div()
             )
 
-        ward_geom = next(
-            f["geometry"] for f in ward_geo["features"]
-            if f["properties"]["GSS_Code"] == selected_code
-        )
-        feats = [
-            f for f in lsoa_geo["features"]
-            if shape(ward_geom).contains(shape(f["geometry"]).centroid)
-        ]
-        geo_l = {"type":"FeatureCollection","features":feats}
-        lcodes = [f["properties"]["LSOA11CD"] for f in feats]
-        fl = (
-            df[df.lsoa_code.isin(lcodes)]
-            .groupby("lsoa_code")["burglary_count"]
-            .sum().reset_index(name="count")
-        ).rename(columns={"lsoa_code":"code"})
+        ward_entry = ward_index[selected_code]
+        fl = lsoa_totals[lsoa_totals.code.isin(ward_entry.lsoa_codes)]
 
-        minx, miny, maxx, maxy = shape(ward_geom).bounds
-        center_l = {"lat":(miny+maxy)/2, "lon":(minx+maxx)/2}
-
-        lsoa_fig = px.choropleth_map(
-            fl, geojson=geo_l, featureidkey="properties.LSOA11CD",
-            locations="code", color="count", opacity=0.7,
+        lsoa_fig = _choropleth(
+            fl, f"ward:{selected_code}",
+            opacity=0.7,
             color_continuous_scale="oryel",
-            map_style="open-street-map",
-            center=center_l, zoom=12,
+            center=ward_entry.center, zoom=12,
             labels={"count":"Burglary Count"},
         )
-        lsoa_fig.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
 
         return (
             ward_fig,
@@ -1064,20 +1359,13 @@ def generate_map(mode, selected_ward, level, past_range=None):
         )
 
     # ─────────────── Full LSOA view
-    df_ls = (
-        df.groupby("lsoa_code")["burglary_count"]
-          .sum().reset_index(name="count")
-          .rename(columns={"lsoa_code":"code"})
-    )
-    lsoaf = px.choropleth_map(
-        df_ls, geojson=lsoa_geo, featureidkey="properties.LSOA11CD",
-        locations="code", color="count", opacity=0.7,
+    lsoaf = _choropleth(
+        lsoa_totals, "lsoa",
+        opacity=0.7,
         color_continuous_scale="oryel",
-        map_style="open-street-map",
         center={"lat":51.5074,"lon":-0.1278}, zoom=10,
         labels={"count":"Burglary Count"},
     )
-    lsoaf.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
 
     return (
         lsoaf,                # map-ward (hidden)
@@ -1089,14 +1377,15 @@ def generate_map(mode, selected_ward, level, past_range=None):
 
 @app.callback(
     Output("Schedule Button", "children"),
+    Output("schedule-link", "href"),
     Input("selected-ward", "data")
 )
 def update_button_label(selected_ward):
     if not selected_ward:
-        return "Download All Ward Schedules"
+        return "Download All Ward Schedules", SCHEDULE_ROUTE
     else:
         ward_code = selected_ward["code"]
-        return f"Download {ward_mapping.get(ward_code, ward_code)} Schedule"
+        return f"Download {ward_mapping.get(ward_code, ward_code)} Schedule", None
 
 @app.callback(
     Output("download-schedule", "data"),
@@ -1105,26 +1394,20 @@ def update_button_label(selected_ward):
     prevent_initial_call=True
 )
 def download_schedule(n_clicks, selected_ward):
-    if n_clicks == 0:
+    if n_clicks == 0 or not selected_ward:
+        # all wards: the link around the button downloads from SCHEDULE_ROUTE
+        return dash.no_update
+
+    selected_ward_name = map_wards_function(selected_ward.get("code"))
+    ward_df = ward_schedule(selected_ward.get("code"), ward_mapping)
+    if ward_df is None:  # no schedule generated yet
         raise PreventUpdate
-    
-    if not selected_ward:
-        df = pd.read_csv(os.path.join(DATA_DIR, "allocations", "All_wards_patrol_schedule.csv"))
-        return dcc.send_data_frame(df.to_csv, "All_wards_patrol_schedule.csv", index=False)
-    else:
-        selected_ward_name = map_wards_function(selected_ward.get("code"))
-        ward_df = get_ward_schedule(selected_ward_name)
-        filename = f"{selected_ward_name}_patrol_schedule.csv"
-        return dcc.send_data_frame(ward_df.to_csv, filename, index=False)
+    filename = f"{selected_ward_name}_patrol_schedule.csv"
+    return dcc.send_data_frame(ward_df.to_csv, filename, index=False)
     
 def map_wards_function(selected_ward):
     print(f"Selected ward: {selected_ward}")
-    return ward_gdf[ward_gdf['GSS_Code'] == selected_ward]['Name'].values[0]
-
-def get_ward_schedule(Ward_name): #This only works if Generate_schedules has run already
-    full_schedule_df = pd.read_csv(os.path.join(DATA_DIR, "allocations", f"All_wards_patrol_schedule.csv"))
-    first_col = full_schedule_df.columns[0]
-    return full_schedule_df[full_schedule_df[first_col].str.startswith(f"{Ward_name}_Officer_")].copy()
+    return ward_mapping[selected_ward]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,56 @@
+import os
+import threading
+
+import pandas as pd
+
+
+class DataStore:
+    """In-process cache of the data files behind the dashboard callbacks.
+
+    Each file is parsed once and kept in memory. `get` re-parses it only when
+    the file's mtime or size changed, e.g. after an upload or a new forecast,
+    so map interactions no longer pay for a full CSV read. Frames are shared
+    between callbacks and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._entries = {}  # (path, name) → ((mtime_ns, size), value)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(path):
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def get(self, path, loader, name=None) -> pd.DataFrame:
+        """Parsed contents of `path`; `name` keeps several values derived from one file apart."""
+        stamp = self._stamp(path)
+        key = (path, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = loader(path)
+        with self._lock:
+            self._entries[key] = (stamp, value)
+        return value
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == path]:
+                    del self._entries[key]
+
+    def version(self, *paths):
+        """Stamp of the given files; changes whenever one of them is rewritten."""
+        return tuple(self._stamp(p) if os.path.exists(p) else None for p in paths)
+
+
+store = DataStore()
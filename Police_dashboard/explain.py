@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from write_lock import atomic_write
+
+# ─── Paths ────────────────────────────────────────────────────────────────────
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+CONTRIBS_PATH = os.path.join(DATA_DIR, "burglary_next_month_contribs.parquet")
+
+BIAS_COL = "bias"
+
+# ─── Writing: one batched pred_contribs call per forecast run ─────────────────
+def save_contributions(model: xgb.XGBRegressor, X: np.ndarray, features, lsoa_codes, path=CONTRIBS_PATH):
+    """Store per-LSOA XGBoost feature contributions (SHAP values) as a parquet file.
+
+    One row per LSOA, one float32 column per feature plus the model bias, so
+    every row sums to the raw (unclipped) prediction for that LSOA.
+    """
+    dmatrix = xgb.DMatrix(X, feature_names=list(features))
+    contribs = model.get_booster().predict(dmatrix, pred_contribs=True)
+
+    out = pd.DataFrame(contribs.astype(np.float32), columns=[*features, BIAS_COL])
+    out.insert(0, "lsoa_code", np.asarray(lsoa_codes))
+    atomic_write(path, out.to_parquet, index=False)
+    print(f"Contributions for {len(out)} LSOAs saved to {path}")
+    return out
+
+# ─── Reading: loaded once, reloaded only when a new forecast lands ────────────
+_loaded = {"mtime": None, "row_of": {}, "values": None, "features": []}
+
+def _load(path=CONTRIBS_PATH):
+    if not os.path.exists(path):
+        return None
+    mtime = os.path.getmtime(path)
+    if _loaded["mtime"] != mtime:
+        df = pd.read_parquet(path)
+        features = [c for c in df.columns if c not in ("lsoa_code", BIAS_COL)]
+        _loaded["row_of"] = {code: i for i, code in enumerate(df["lsoa_code"])}
+        _loaded["values"] = df[features].to_numpy(dtype=np.float32)
+        _loaded["features"] = features
+        _loaded["mtime"] = mtime
+    return _loaded
+
+def top_drivers(lsoa_codes, n=8) -> pd.DataFrame:
+    """Top `n` features by absolute contribution, summed over the given LSOAs.
+
+    Pass a single LSOA for an LSOA drill-down or every LSOA of a ward for the
+    ward-level explanation.
+    """
+    data = _load()
+    if data is None:
+        return pd.DataFrame(columns=["feature", "contribution"])
+
+    rows = [data["row_of"][c] for c in lsoa_codes if c in data["row_of"]]
+    if not rows:
+        return pd.DataFrame(columns=["feature", "contribution"])
+
+    summed = data["values"][rows].sum(axis=0)
+    order = np.argsort(-np.abs(summed))[:n]
+    return pd.DataFrame({
+        "feature": [data["features"][i] for i in order],
+        "contribution": summed[order].round(3),
+    })
@@ -0,0 +1,81 @@
+import os
+import json
+from collections import namedtuple
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import shape
+
+from feature_cache import lineage_hash
+from write_lock import atomic_write_json
+from geometry import read_boundaries
+
+# ─── Paths ────────────────────────────────────────────────────────────────────
+CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "cache"))
+LSOA_WARD_CACHE = os.path.join(CACHE_DIR, "lsoa_ward_mapping.json")
+
+# ─── LSOA → ward mapping ──────────────────────────────────────────────────────
+def build_lsoa_to_ward(lsoa_gdf, ward_gdf, lsoa_key="LSOA11CD", ward_key="GSS_Code"):
+    """Map every LSOA to the ward containing its centroid, using one STRtree query.
+
+    When several wards contain a centroid the first ward in file order wins,
+    like the old nested loop did.
+    """
+    centroids = shapely.centroid(lsoa_gdf.geometry.to_numpy())
+    tree = STRtree(ward_gdf.geometry.to_numpy())
+    point_idx, ward_idx = tree.query(centroids, predicate="within")
+
+    order = np.lexsort((ward_idx, point_idx))
+    point_idx, ward_idx = point_idx[order], ward_idx[order]
+    _, first = np.unique(point_idx, return_index=True)
+
+    lsoa_codes = lsoa_gdf[lsoa_key].to_numpy()
+    ward_codes = ward_gdf[ward_key].to_numpy()
+    return {str(lsoa_codes[p]): str(ward_codes[w]) for p, w in zip(point_idx[first], ward_idx[first])}
+
+def load_lsoa_to_ward(lsoa_path, ward_path, cache_path=LSOA_WARD_CACHE):
+    """LSOA → ward mapping, read from disk unless either GeoJSON file changed.
+
+    The boundary files are only parsed when the mapping has to be rebuilt.
+    """
+    cached = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, encoding="utf-8") as f:
+            cached = json.load(f)
+
+    key, inputs = lineage_hash([lsoa_path, ward_path], [build_lsoa_to_ward], cached.get("inputs"))
+    if cached.get("key") == key:
+        return cached["mapping"]
+
+    mapping = build_lsoa_to_ward(read_boundaries(lsoa_path), read_boundaries(ward_path))
+    atomic_write_json(cache_path, {"key": key, "inputs": inputs, "mapping": mapping})
+    return mapping
+
+# ─── Ward → LSOA index (drill-down) ───────────────────────────────────────────
+WardEntry = namedtuple("WardEntry", ["lsoa_codes", "geojson", "bounds", "center"])
+
+def build_ward_index(ward_geo, lsoa_geo, lsoa_to_ward, ward_key="GSS_Code", lsoa_key="LSOA11CD"):
+    """ward code → its LSOA codes, a FeatureCollection of those LSOAs, bounds and center.
+
+    Built once at startup so a drill-down is a dictionary lookup instead of a
+    centroid test against every LSOA polygon.
+    """
+    ward_codes = [f["properties"][ward_key] for f in ward_geo["features"]]
+    features = {code: [] for code in ward_codes}
+    for feat in lsoa_geo["features"]:
+        ward_code = lsoa_to_ward.get(feat["properties"][lsoa_key])
+        if ward_code in features:
+            features[ward_code].append(feat)
+
+    index = {}
+    for code, ward in zip(ward_codes, ward_geo["features"]):
+        minx, miny, maxx, maxy = shape(ward["geometry"]).bounds
+        feats = features[code]
+        index[code] = WardEntry(
+            lsoa_codes=[f["properties"][lsoa_key] for f in feats],
+            geojson={"type": "FeatureCollection", "features": feats},
+            bounds=(minx, miny, maxx, maxy),
+            center={"lat": (miny + maxy) / 2, "lon": (minx + maxx) / 2},
+        )
+    return index
@@ -0,0 +1,72 @@
+import os
+import json
+
+import numpy as np
+import shapely
+import geopandas as gpd
+
+from feature_cache import lineage_hash
+from write_lock import atomic_write_json
+
+try:
+    import topojson
+except ImportError:  # optional: shared-border simplification, per-polygon otherwise
+    topojson = None
+
+# ─── Paths ────────────────────────────────────────────────────────────────────
+GEO_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "cache", "geo"))
+
+# Simplification tolerance (degrees, EPSG:4326) per view:
+#   london → whole-city maps at zoom ~10 (~95 m a pixel), ~30 m
+#   ward   → drill-down maps at zoom ~12 (~24 m a pixel), ~5 m
+# Without topojson, neighbours are simplified separately and may open gaps or
+# overlaps up to twice the tolerance wide along shared borders; both levels
+# keep that below a pixel at their zoom, but not when zoomed in further.
+LEVELS = {"london": 0.0003, "ward": 0.00005}
+DECIMALS = 5  # ~1 m
+
+def read_boundaries(path):
+    """Boundary file as a GeoDataFrame in EPSG:4326."""
+    return gpd.read_file(path).to_crs(epsg=4326)
+
+def simplify_geojson(gdf, tolerance, decimals=DECIMALS) -> dict:
+    """GeoJSON dict of `gdf` with simplified polygons and rounded coordinates.
+
+    With topojson installed, borders shared by neighbouring areas are
+    simplified once as arcs (TopoJSON-style), so neighbours stay gap-free.
+    Otherwise each polygon is simplified on its own with
+    preserve_topology=True (no collapsed or self-intersecting rings; see
+    LEVELS for the resulting sliver width). Coordinates are then snapped to
+    a 10^-decimals grid.
+    """
+    if topojson is not None:
+        topo = topojson.Topology(gdf, prequantize=False, toposimplify=tolerance, prevent_oversimplify=True)
+        gdf = topo.to_gdf().set_crs(gdf.crs, allow_override=True)
+        geoms = gdf.geometry.to_numpy()
+    else:
+        geoms = shapely.simplify(gdf.geometry.to_numpy(), tolerance, preserve_topology=True)
+    geoms = shapely.set_precision(geoms, 10.0 ** -decimals)
+    # set_precision leaves float noise (51.50001000000001); round for compact JSON
+    geoms = shapely.transform(geoms, lambda coords: np.round(coords, decimals))
+    return json.loads(gdf.set_geometry(geoms).to_json(drop_id=True))
+
+def load_geojson(name, source_path, level, cache_dir=GEO_CACHE_DIR) -> dict:
+    """Simplified GeoJSON for one view level, read from disk unless the source changed.
+
+    The boundary file itself is only parsed when the cache has to be rebuilt.
+    """
+    cache_path = os.path.join(cache_dir, f"{name}_{level}.json")
+    cached = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, encoding="utf-8") as f:
+            cached = json.load(f)
+
+    key, inputs = lineage_hash([source_path], [simplify_geojson], cached.get("inputs"))
+    key = f"{key}:{LEVELS[level]}:{DECIMALS}:{'arcs' if topojson else 'polygons'}"
+    if cached.get("key") == key:
+        return cached["geojson"]
+
+    geojson = simplify_geojson(read_boundaries(source_path), LEVELS[level])
+    atomic_write_json(cache_path, {"key": key, "inputs": inputs, "geojson": geojson}, separators=(",", ":"))
+    print(f"▶ Simplified {name} geometry for '{level}' view → {cache_path}")
+    return geojson
@@ -0,0 +1,39 @@
+# gunicorn -c gunicorn.conf.py app:server
+#
+# preload_app imports app.py (model, GeoJSON, LSOA → ward lookup, cubes) once
+# in the master before forking, so workers start without loading or parsing
+# anything. Only the prefix cubes are truly shared (memory-mapped files); the
+# Python objects are inherited copy-on-write, and reference counting copies
+# each page a worker touches. pre_fork freezes them out of the garbage
+# collector so at least its scans do not copy the rest. Anything that changes
+# afterwards (an upload, a retrained model, a new prediction) is written to
+# disk atomically and picked up by every worker through its file stamp.
+import gc
+import os
+import shutil
+
+bind = os.environ.get("DASHBOARD_BIND", "0.0.0.0:8050")
+workers = int(os.environ.get("DASHBOARD_WORKERS", 4))
+threads = int(os.environ.get("DASHBOARD_THREADS", 2))
+preload_app = True
+# uploads rebuild features and refit the model in the request; they wait at
+# most write_lock.REQUEST_LOCK_TIMEOUT for the write lock, so the budget is
+# that wait plus the work itself
+timeout = 120
+
+# Metrics are kept per worker in files under this directory and summed on
+# every scrape (metrics.py). It must be set before the app imports
+# prometheus_client, and emptied so a previous run's values are not added in.
+PROMETHEUS_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "cache", "prometheus")),
+)
+shutil.rmtree(PROMETHEUS_DIR, ignore_errors=True)
+os.makedirs(PROMETHEUS_DIR, exist_ok=True)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)  # drop the worker's live gauges
+
+def pre_fork(server, worker):
+    gc.freeze()  # preloaded objects move to the permanent generation, never scanned by a worker's GC
@@ -3,6 +3,10 @@ import numpy as np
 from sklearn.preprocessing import RobustScaler
 from xgboost import XGBRegressor
 
+from explain import save_contributions
+from dtype_policy import apply_dtype_policy
+from write_lock import atomic_write
+
 def _calendar_cols(month_series: pd.Series) -> pd.DataFrame:
     """Return sin/cos month embeddings + quarter/holiday flags."""
     month_num = month_series.dt.month
@@ -78,17 +82,22 @@ def build_forecast_rows(df: pd.DataFrame, forecast_month) -> pd.DataFrame:
 
 def save_prediction(model: XGBRegressor, scaler: RobustScaler, month):
     df = pd.read_csv("../data/XGBoost_ready_dataset_with_features.csv", parse_dates=["month", "year_month"])
+    df = apply_dtype_policy(df)
 
     features = scaler.feature_names_in_
 
     month = pd.Timestamp(month)
     next_rows = build_forecast_rows(df, month)
 
-    X_next = scaler.transform(next_rows[features])
+    X_next = scaler.transform(next_rows[features]).astype(np.float32)
     next_rows["predicted_burglary"] = model.predict(X_next)
     next_rows["predicted_burglary"] = next_rows["predicted_burglary"].clip(lower=0).round().astype(int)
 
+    # Per-LSOA drivers for the dashboard drill-down
+    save_contributions(model, X_next, features, next_rows["lsoa_code"])
+
     # Save or concatenate with history
-    next_rows[["lsoa_code", "year_month", "predicted_burglary"]].to_csv(
-        "../data/burglary_next_month_forecast.csv", index=False
+    atomic_write(
+        "../data/burglary_next_month_forecast.csv",
+        next_rows[["lsoa_code", "year_month", "predicted_burglary"]].to_csv, index=False,
     )
\ No newline at end of file
@@ -0,0 +1,151 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from functools import wraps
+
+from flask import Response, g, jsonify, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+# Request/callback latency and payload histograms, cache hit/miss counters and
+# a rolling log of slow requests, exposed in Prometheus text format on /metrics.
+# Under gunicorn, PROMETHEUS_MULTIPROC_DIR (set in gunicorn.conf.py) makes every
+# worker keep its values in files there, and a scrape answered by any worker
+# sums them over all workers.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 3e5, 1e6, 3e6, 1e7)
+SLOW_SECONDS = 1.0
+SLOW_LOG_SIZE = 200
+
+DASH_UPDATE_PATH = "/_dash-update-component"
+
+log = logging.getLogger(__name__)
+
+LATENCY = Histogram("dashboard_latency_seconds", "Time spent in a route, Dash callback or function.",
+                    ["kind", "handler"], buckets=LATENCY_BUCKETS)
+PAYLOAD = Histogram("dashboard_response_bytes", "Response body size.",
+                    ["kind", "handler"], buckets=SIZE_BUCKETS)
+ERRORS = Counter("dashboard_errors", "Calls that raised or answered with a 5xx status.", ["kind", "handler"])
+# the caches count in plain attributes; each worker adds what they counted
+# since its last publish_caches() to these
+CACHE_HITS = Counter("dashboard_cache_hits", "Cache hits.", ["cache"])
+CACHE_MISSES = Counter("dashboard_cache_misses", "Cache misses.", ["cache"])
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._caches = {}  # cache name → () → (hits, misses)
+        self._published = {}  # cache name → (hits, misses) already added to the counters
+        self.slow = deque(maxlen=SLOW_LOG_SIZE)
+
+    def observe(self, kind, handler, seconds, size=None, error=False):
+        LATENCY.labels(kind, handler).observe(seconds)
+        if size is not None:
+            PAYLOAD.labels(kind, handler).observe(size)
+        if error:
+            ERRORS.labels(kind, handler).inc()
+        if seconds >= SLOW_SECONDS:
+            with self._lock:
+                self.slow.append({
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "pid": os.getpid(), "kind": kind,
+                    "handler": handler, "seconds": round(seconds, 3), "bytes": size, "error": error,
+                })
+            log.warning("Slow %s %s: %.2fs", kind, handler, seconds)
+
+    def slow_requests(self):
+        """Recent slow requests of this worker (all workers log them)."""
+        with self._lock:
+            return list(self.slow)
+
+    def register_cache(self, name, stats):
+        """`stats()` returns the cache's (hits, misses) counters."""
+        self._caches[name] = stats
+
+    def publish_caches(self):
+        """Add what this process's caches counted since the last call to the exported counters."""
+        with self._lock:
+            for name, stats in self._caches.items():
+                now = stats()
+                before = self._published.get(name, (0, 0))
+                for counter, n, prev in ((CACHE_HITS, now[0], before[0]), (CACHE_MISSES, now[1], before[1])):
+                    # a cache that reset its counts starts again from zero
+                    delta = n - prev if n >= prev else n
+                    if delta:
+                        counter.labels(name).inc(delta)
+                self._published[name] = now
+
+    def timed(self, name=None, kind="function"):
+        """Decorator recording the latency of every call of the wrapped function."""
+        def decorate(func):
+            handler = name or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                error = False
+                try:
+                    return func(*args, **kwargs)
+                except Exception:
+                    error = True
+                    raise
+                finally:
+                    self.observe(kind, handler, time.perf_counter() - start, error=error)
+            return wrapper
+        return decorate
+
+    def render(self) -> bytes:
+        """All metrics in the Prometheus text exposition format, summed over workers."""
+        self.publish_caches()
+        if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+            return generate_latest(REGISTRY)
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+
+
+metrics = Metrics()
+timed = metrics.timed
+
+def _callback_name(dash_app):
+    """Name of the Dash callback a /_dash-update-component request runs."""
+    body = request.get_json(silent=True) or {}
+    output = body.get("output", "")
+    func = dash_app.callback_map.get(output, {}).get("callback")
+    return getattr(func, "__name__", None) or output or "unknown"
+
+def instrument(server, dash_app, path="/metrics"):
+    """Time every Flask route and Dash callback of `server` and serve the metrics.
+
+    Dash runs all callbacks through one route, so those requests are labelled
+    with the callback's function name instead of the URL rule.
+    """
+    @server.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def _record(response):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return response
+        if request.path.endswith(DASH_UPDATE_PATH):
+            kind, handler = "callback", _callback_name(dash_app)
+        else:
+            kind = "route"
+            handler = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        metrics.observe(kind, handler, time.perf_counter() - start,
+                        size=response.content_length, error=response.status_code >= 500)
+        metrics.publish_caches()  # keeps every worker's share current, not just the scraped one
+        return response
+
+    @server.route(path)
+    def _metrics():
+        return Response(metrics.render(), content_type=CONTENT_TYPE_LATEST)
+
+    @server.route(f"{path}/slow")
+    def _slow_requests():
+        return jsonify(metrics.slow_requests())
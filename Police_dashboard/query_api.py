@@ -0,0 +1,109 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from aggregates import month_bounds, month_label
+
+# Filtered, paginated reads of the monthly burglary counts behind
+# /police-dashboard/api/query. Rows come straight out of the prefix-sum cubes
+# (LSOA or ward × month), ordered by area then month, so a page only costs the
+# rows it returns.
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 50000
+
+COLUMNS = {
+    "lsoa": ["lsoa_code", "ward_code", "month", "burglary_count"],
+    "ward": ["ward_code", "month", "burglary_count"],
+}
+
+class QueryError(ValueError):
+    """Bad query parameter, reported to the client as a 400."""
+
+def _month(value, name):
+    try:
+        ts = pd.Timestamp(value)
+    except ValueError:
+        raise QueryError(f"'{name}' must be a month like 2024-03, got {value!r}")
+    return ts.year * 12 + ts.month - 1
+
+def _int(value, name, default, lo, hi):
+    if value in (None, ""):
+        return default
+    try:
+        n = int(value)
+    except ValueError:
+        raise QueryError(f"'{name}' must be an integer, got {value!r}")
+    if not lo <= n <= hi:
+        raise QueryError(f"'{name}' must be between {lo} and {hi}")
+    return n
+
+def run_query(cubes, lsoa_to_ward, args):
+    """Columns (name → array) and paging info for the request arguments.
+
+    args: level=lsoa|ward, start/end=YYYY-MM (inclusive), codes=comma list,
+          columns=comma list, page (1-based), limit.
+    """
+    level = args.get("level", "ward")
+    if level not in COLUMNS:
+        raise QueryError("'level' must be 'lsoa' or 'ward'")
+    cube = cubes[level]
+    first, last = month_bounds(cube)
+
+    m0 = _month(args["start"], "start") if args.get("start") else first
+    m1 = _month(args["end"], "end") if args.get("end") else last
+    m0, m1 = max(m0, first), min(m1, last)
+
+    columns = args.get("columns")
+    columns = columns.split(",") if columns else COLUMNS[level]
+    unknown = set(columns) - set(COLUMNS[level])
+    if unknown:
+        raise QueryError(f"Unknown columns for level '{level}': {', '.join(sorted(unknown))}")
+
+    area_idx = np.arange(len(cube.codes))
+    if args.get("codes"):
+        wanted = np.array([c.strip() for c in args["codes"].split(",") if c.strip()])
+        area_idx = area_idx[np.isin(cube.codes, wanted)]
+
+    limit = _int(args.get("limit"), "limit", DEFAULT_LIMIT, 1, MAX_LIMIT)
+    page = _int(args.get("page"), "page", 1, 1, np.iinfo(np.int32).max)
+
+    n_months = max(m1 - m0 + 1, 0)
+    total = len(area_idx) * n_months
+    rows = np.arange((page - 1) * limit, min(page * limit, total))
+    areas = area_idx[rows // n_months] if n_months else area_idx[:0]
+    months = m0 + rows % n_months if n_months else rows
+
+    codes = cube.codes[areas]
+    col = months - cube.first_month
+    data = {
+        f"{level}_code": codes,
+        "month": np.array([month_label(m) for m in months], dtype=str),
+        "burglary_count": cube.cum[areas, col + 1] - cube.cum[areas, col],
+    }
+    if level == "lsoa":
+        data["ward_code"] = np.array([lsoa_to_ward.get(c, "") for c in codes], dtype=str)
+
+    meta = {
+        "level": level,
+        "start": month_label(m0) if n_months else None,
+        "end": month_label(m1) if n_months else None,
+        "page": page,
+        "limit": limit,
+        "total_rows": int(total),
+        "pages": int(-(-total // limit)),
+    }
+    return {c: data[c] for c in columns}, meta
+
+def to_json(columns, meta):
+    """Column-oriented JSON body: paging info plus one list per column."""
+    return {**meta, "columns": {c: v.tolist() for c, v in columns.items()}}
+
+def to_arrow(columns, meta) -> bytes:
+    """Arrow IPC stream of the page; paging info goes in the schema metadata."""
+    table = pa.table(columns).replace_schema_metadata({k: str(v) for k, v in meta.items()})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
@@ -0,0 +1,59 @@
+import os
+import json
+
+import pandas as pd
+
+from data_store import store
+
+# ─── Paths ────────────────────────────────────────────────────────────────────
+ALLOC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "allocations"))
+SCHEDULE_CSV = os.path.join(ALLOC_DIR, "All_wards_patrol_schedule.csv")
+PARTITION_DIR = os.path.join(ALLOC_DIR, "by_ward")
+INDEX_PATH = os.path.join(PARTITION_DIR, "index.json")
+
+# generate_schedules.py writes the all-wards CSV together with one parquet file
+# per ward in a versioned directory, published through index.json (version,
+# columns, ward code → file). A drill-down or download is then an index lookup
+# and a read of that ward's rows, cached in memory by the store. Readers never
+# write. Schedules saved before partitioning have no index; those are grouped
+# by ward from the CSV itself.
+OFFICER_SEP = "_Officer_"  # officer ids look like "<ward name>_Officer_<n>"
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def schedule_index():
+    """Index of the current schedule partitions, or None when no schedule was written."""
+    if not os.path.exists(INDEX_PATH):
+        return None
+    return store.get(INDEX_PATH, _read_json, name="schedule_index")
+
+def _csv_by_ward(ward_names):
+    """Loader for a schedule CSV without partitions: ward code → rows."""
+    def load(csv_path):
+        df = pd.read_csv(csv_path)
+        if "ward_code" in df.columns:
+            return {code: part.reset_index(drop=True) for code, part in df.groupby("ward_code", sort=False)}
+        # older files only carry the ward name in the officer id
+        officer = df[df.columns[0]].astype(str)
+        ward_name = officer.str.rsplit(OFFICER_SEP, n=1).str[0].where(officer.str.contains(OFFICER_SEP))
+        parts = {name: part.reset_index(drop=True) for name, part in df.groupby(ward_name, sort=False)}
+        # wards sharing a name share their officers, as with the old prefix match
+        return {code: parts[name] for code, name in ward_names.items() if name in parts}
+    return load
+
+def ward_schedule(ward_code, ward_names):
+    """Patrol schedule rows of one ward (read-only), or None when no schedule exists.
+
+    ward_names (ward code → name) resolves wards in CSVs without a ward_code column.
+    """
+    index = schedule_index()
+    if index is None:
+        if not os.path.exists(SCHEDULE_CSV):
+            return None
+        by_ward = store.get(SCHEDULE_CSV, _csv_by_ward(ward_names), name="schedule_by_ward")
+        return by_ward.get(ward_code, pd.DataFrame(columns=pd.read_csv(SCHEDULE_CSV, nrows=0).columns))
+    filename = index["wards"].get(ward_code)
+    if filename is None:
+        return pd.DataFrame(columns=index["columns"])
+    return store.get(os.path.join(PARTITION_DIR, index["version"], filename), pd.read_parquet)
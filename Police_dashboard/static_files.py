@@ -0,0 +1,115 @@
+import os
+import gzip
+import hashlib
+import mimetypes
+import threading
+
+from flask import request, send_file, abort, make_response
+from werkzeug.security import safe_join
+
+from feature_cache import file_digest
+from write_lock import atomic_write_bytes
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# ─── Paths ────────────────────────────────────────────────────────────────────
+# Precompressed variants, named <source key>-<content hash>.<ext> so a changed
+# file never serves a stale variant and the superseded ones can be found
+HTTP_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "cache", "http"))
+
+COMPRESSIBLE = ("text/", "application/json", "application/javascript", "image/svg+xml",
+                "application/geo+json", "application/xml")
+MIN_COMPRESS_BYTES = 1024
+# Variants are built on the first request for a new version; above
+# LARGE_FILE_BYTES (the master CSV) use cheaper levels so that request stays fast
+LARGE_FILE_BYTES = 1 << 20
+LEVELS = {"br": (9, 5), "gzip": (9, 6)}  # encoding → (level, level for large files)
+
+# Static assets can be reused for an hour; data files change on upload, so
+# clients must revalidate them (a cheap 304 when nothing changed)
+STATIC_CACHE = "public, max-age=3600"
+DATA_CACHE = "no-cache"
+
+_digests = {}  # path → ((mtime_ns, size), sha256)
+_lock = threading.Lock()
+
+def _digest(path):
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        entry = _digests.get(path)
+        if entry is not None and entry[0] == stamp:
+            return entry[1], st.st_size
+    digest = file_digest(path)
+    with _lock:
+        _digests[path] = (stamp, digest)
+    return digest, st.st_size
+
+def _source_key(path):
+    return hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+
+def _remove_superseded(source_key, digest):
+    """Delete the variants of older versions of a source file."""
+    for name in os.listdir(HTTP_CACHE_DIR):
+        if name.startswith(f"{source_key}-") and not name.startswith(f"{source_key}-{digest}."):
+            try:
+                os.remove(os.path.join(HTTP_CACHE_DIR, name))
+            except FileNotFoundError:  # another worker removed it first
+                pass
+
+def _compress(path, digest, encoding):
+    """Path of the `encoding` variant of `path`, written once per content hash."""
+    ext = {"br": "br", "gzip": "gz"}[encoding]
+    source_key = _source_key(path)
+    out = os.path.join(HTTP_CACHE_DIR, f"{source_key}-{digest}.{ext}")
+    if os.path.exists(out):
+        return out
+    with open(path, "rb") as f:
+        data = f.read()
+    level = LEVELS[encoding][len(data) > LARGE_FILE_BYTES]
+    data = brotli.compress(data, quality=level) if encoding == "br" else gzip.compress(data, compresslevel=level, mtime=0)
+    atomic_write_bytes(out, data)
+    _remove_superseded(source_key, digest)
+    return out
+
+def _pick_encoding(mimetype, size):
+    if size < MIN_COMPRESS_BYTES or not (mimetype or "").startswith(COMPRESSIBLE):
+        return None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+def send_cached(directory, filename, cache_control=STATIC_CACHE, download_name=None):
+    """send_from_directory with precompressed variants, a strong ETag and 304s.
+
+    With `download_name` the file is sent as an attachment under that name.
+    """
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    digest, size = _digest(path)
+    encoding = _pick_encoding(mimetype, size)
+    # strong ETags are per representation, so the encoding is part of it
+    etag = f"{digest[:32]}-{encoding}" if encoding else digest[:32]
+
+    headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    else:
+        body = _compress(path, digest, encoding) if encoding else path
+        response = send_file(body, mimetype=mimetype, conditional=False, etag=False, max_age=None)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.headers.update(headers)
+    if download_name:
+        response.headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
+    return response
@@ -1,98 +1,49 @@
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 import xgboost as xgb
-from xgboost import XGBRegressor
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from sklearn.preprocessing import RobustScaler
-from sklearn.model_selection import TimeSeriesSplit
-from scipy.stats import entropy
 from pandas.tseries.offsets import MonthBegin
 
-# load the dataset
-df = pd.read_csv("data/XGBoost_ready_dataset.csv")
-df["month"] = pd.to_datetime(df["month"])
-df["year_month"] = df["month"].dt.to_period("M")
-df = df[df["burglary_count"].notna() & (df["burglary_count"] >= 0)].copy()
-df.sort_values(["lsoa_code", "month"], inplace=True)
-df.reset_index(drop=True, inplace=True)
-
-# add time features
-for lag in [1, 3, 6, 12]:
-    col = f"crime_count_pct_change_{lag}m"
-    df[col] = df.groupby("lsoa_code")["crime_count"].pct_change(lag)
-    df[col] = df[col].replace([np.inf, -np.inf], np.nan).fillna(0)
-
-df["month_num"] = df["month"].dt.month
-df["month_sin"] = np.sin(2 * np.pi * df["month_num"] / 12)
-df["month_cos"] = np.cos(2 * np.pi * df["month_num"] / 12)
-df["quarter"] = df["month"].dt.quarter
-df["is_holiday"] = df["month_num"].isin([11, 12]).astype(int)
-
-if "crime_count_lag_1m" not in df.columns:
-    df["crime_count_lag_1m"] = df.groupby("lsoa_code")["crime_count"].shift(1).fillna(0)
-
-if "crime_count_lag_3m" not in df.columns:
-    df["crime_count_lag_3m"] = df.groupby("lsoa_code")["crime_count"].shift(3).fillna(0)
-
-# add interaction features
-df["lag1_crime_x_pop"] = df["crime_count_lag_1m"] * df["population"]
-df["lag3_crime_x_imd"] = df["crime_count_lag_3m"] * df["imd_decile_2019"].astype(float)
-
-df["crime_volatility_3m"] = (
-    df.groupby("lsoa_code")["crime_count"]
-    .transform(lambda x: x.rolling(3, min_periods=1).std())
-    .fillna(0)
+from burglary_features import (
+    load_dataset, add_model_features, add_burglary_history, feature_columns, DATASET_PATH, BEST_PARAMS,
 )
-
-crime_types = [c for c in df.columns if c.startswith("crime_") and c.endswith("_count") and c != "burglary_count"]
-crime_data = df[crime_types].to_numpy()
-
-# Normalize rows (avoid division by zero)
-row_sums = crime_data.sum(axis=1, keepdims=True)
-row_sums[row_sums == 0] = 1  # to avoid division by zero
-prob_matrix = crime_data / row_sums
-
-# Compute entropy for each row
-df["crime_entropy"] = entropy(prob_matrix.T, base=np.e)
-
-# months since last burglary
-def time_since_burglary(series):
-    last_seen = -1
-    result = []
-    for val in series:
-        if val > 0:
-            last_seen = 0
-        elif last_seen >= 0:
-            last_seen += 1
-        result.append(last_seen if last_seen >= 0 else np.nan)
-    return result
-
-df["months_since_burglary"] = df.groupby("lsoa_code")["burglary_count"].transform(time_since_burglary).fillna(100)
-
-# extended interactions
-df["lag1_x_entropy"] = df["crime_count_lag_1m"] * df["crime_entropy"]
-df["lag3_x_entropy"] = df["crime_count_lag_3m"] * df["crime_entropy"]
-
-df["entropy_x_sin"] = df["crime_entropy"] * df["month_sin"]
-df["entropy_x_cos"] = df["crime_entropy"] * df["month_cos"]
-
-df["entropy_x_imd2019"] = df["crime_entropy"] * df["imd_decile_2019"].astype(float)
-df["volatility_x_sin"] = df["crime_volatility_3m"] * df["month_sin"]
-df["volatility_x_cos"] = df["crime_volatility_3m"] * df["month_cos"]
-
-df["stop_x_imd2019"] = df["stop_and_search_count"] * df["imd_decile_2019"].astype(float)
-df["imd2019_x_msb"] = df["imd_decile_2019"].astype(float) * df["months_since_burglary"]
-
-# feature selection
-exclude_cols = {
-    "lsoa_code", "month", "year_month", "crime_type",
-    "latitude", "longitude", "burglary_count", "crime_count"
-}
-features = [c for c in df.columns if c not in exclude_cols and df[c].dtype in [np.int64, np.float64]]
+from feature_cache import cached_features, FeatureSet
+from write_lock import WRITE_LOCK, atomic_write
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Police_dashboard"))
+from explain import save_contributions
+
+def build_features() -> FeatureSet:
+    df = add_model_features(load_dataset())
+    features = feature_columns(df)
+    return FeatureSet(
+        X=df[features].to_numpy(dtype=np.float32),
+        y=df["burglary_count"].to_numpy(dtype=np.float32),
+        lsoa_code=df["lsoa_code"].to_numpy(),
+        month=df["month"].to_numpy(),
+        features=features,
+        extras={"crime_count": df["crime_count"].to_numpy(dtype=np.float32)},
+    )
+
+# load the features (memory-mapped from data/cache unless the dataset or build_features changed)
+fs = cached_features("xgb_with_data_features", [DATASET_PATH], ["burglary_features.py", "dtype_policy.py", build_features], build_features)
+features = fs.features
+
+# slim frame rebuilt from the cache: model features plus what the forecast step needs
+df = pd.DataFrame(fs.X, columns=features)
+df["lsoa_code"] = fs.lsoa_code
+df["month"] = pd.to_datetime(fs.month)
+df["year_month"] = df["month"].dt.to_period("M")
+df["burglary_count"] = fs.y
+df["crime_count"] = fs.extras["crime_count"]
 
 # scaling
 scaler = RobustScaler()
-X = scaler.fit_transform(df[features])
+X = scaler.fit_transform(df[features]).astype(np.float32)
 y = df["burglary_count"]
 
 # splits
@@ -103,22 +54,7 @@ X_train, X_val, X_test = X[train], X[val], X[test]
 y_train, y_val, y_test = y[train], y[val], y[test]
 
 # model training
-best_params = {
-    'n_estimators': 500,
-    'learning_rate': 0.2194440144154437,
-    'max_depth': 5,
-    'min_child_weight': 3,
-    'subsample': 0.718124691088876,
-    'colsample_bytree': 0.7743729096902522,
-    'gamma': 3.361223663481572,
-    'alpha': 4.578509071143608,
-    'reg_lambda': 1.7898710081745761,
-    'random_state': 42,
-    'eval_metric': 'rmse',
-    'verbosity': 1
-}
-
-final_model = xgb.XGBRegressor(**best_params)
+final_model = xgb.XGBRegressor(**BEST_PARAMS)
 final_model.fit(
     X_train,
     y_train,
@@ -167,7 +103,18 @@ next_df["month_num"] = next_df["month"].dt.month
 next_df["month_sin"] = np.sin(2 * np.pi * next_df["month_num"] / 12)
 next_df["month_cos"] = np.cos(2 * np.pi * next_df["month_num"] / 12)
 next_df["quarter"] = next_df["month"].dt.quarter
-next_df["is_holiday"] = next_df["month_num"].isin([11, 12]).astype(int)
+next_df["is_holiday_season"] = next_df["month_num"].isin([11, 12]).astype(int)
+
+# every burglary lag / rolling column, recomputed over the history with the
+# next month appended (its own count unknown), as the dataset builds them
+history = pd.concat([
+    df[["lsoa_code", "month", "burglary_count", "population"]],
+    next_df[["lsoa_code", "month", "population"]].assign(burglary_count=np.nan),
+], ignore_index=True).sort_values(["lsoa_code", "month"], kind="stable")
+history = add_burglary_history(history)
+rolled = history[history["month"] == next_month].set_index("lsoa_code")
+for col in [c for c in rolled.columns if c in features]:
+    next_df[col] = rolled[col].reindex(next_df["lsoa_code"]).to_numpy()
 
 next_df["crime_count_lag_1m"] = latest_df["crime_count"]
 next_df["crime_count_lag_3m"] = df.groupby("lsoa_code")["crime_count"].transform(
@@ -193,13 +140,17 @@ next_df["volatility_x_cos"] = latest_df["crime_volatility_3m"] * next_df["month_
 next_df["stop_x_imd2019"] = latest_df["stop_and_search_count"] * next_df["imd_decile_2019"].astype(float)
 next_df["imd2019_x_msb"] = next_df["imd_decile_2019"].astype(float) * next_df["months_since_burglary"]
 
-X_next = scaler.transform(next_df[features])
+X_next = scaler.transform(next_df[features]).astype(np.float32)
 
 # prediction
 next_df["predicted_burglary"] = final_model.predict(X_next)
 next_df["predicted_burglary"] = next_df["predicted_burglary"].clip(lower=0).round().astype(int)
 
-# export
-next_df[["lsoa_code", "year_month", "predicted_burglary"]].to_csv("data/burglary_next_month_forecast.csv", index=False)
+# export the forecast and its per-LSOA feature contributions (SHAP) for the
+# drill-down; the dashboard reads (and rewrites) both, so swap them in under its write lock
+with WRITE_LOCK:
+    atomic_write("data/burglary_next_month_forecast.csv",
+                 next_df[["lsoa_code", "year_month", "predicted_burglary"]].to_csv, index=False)
+    save_contributions(final_model, X_next, features, next_df["lsoa_code"])
 print("data/burglary_next_month_forecast.csv")
 
@@ -0,0 +1,119 @@
+"""
+Rolling-origin backtest of the XGBoost burglary model.
+
+For every origin month the model is retrained on all earlier months and
+forecasts that month. Folds run in parallel worker processes which share one
+feature matrix through memory-mapped .npy files from the feature cache, so
+features are only rebuilt when the dataset or feature code changes.
+
+    python backtest_XGBoost.py --start 2022-01 --workers 8
+"""
+import os
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+import xgboost as xgb
+
+from burglary_features import load_dataset, add_model_features, feature_columns, DATASET_PATH, BEST_PARAMS
+from feature_cache import cached_features, FeatureSet, CACHE_DIR
+
+LOOKUP_PATH = "data/lsoa_to_ward.json"
+OUTPUT_PATH = "data/backtest_results.csv"
+
+def month_index(months: pd.Series) -> np.ndarray:
+    """Months as consecutive integers (year * 12 + month - 1)."""
+    return (months.dt.year * 12 + months.dt.month - 1).to_numpy(dtype=np.int32)
+
+# ─── Shared arrays ────────────────────────────────────────────────────────────
+CACHE_NAME = "backtest_features"
+
+def build_features() -> FeatureSet:
+    """Feature matrix sorted by month, so every fold is a contiguous slice."""
+    df = add_model_features(load_dataset())
+    features = feature_columns(df)
+    df = df.sort_values(["month", "lsoa_code"], kind="stable").reset_index(drop=True)
+    return FeatureSet(
+        X=df[features].to_numpy(dtype=np.float32),
+        y=df["burglary_count"].to_numpy(dtype=np.float32),
+        lsoa_code=df["lsoa_code"].to_numpy(),
+        month=df["month"].to_numpy(),
+        features=features,
+        extras={"month_idx": month_index(df["month"])},
+    )
+
+# ─── Worker side ──────────────────────────────────────────────────────────────
+_shared = {}
+
+def _attach(entry_dir):
+    """Process initializer: map the shared arrays read-only instead of copying them."""
+    for name, fname in (("X", "X.npy"), ("y", "y.npy"), ("month_idx", "extra_month_idx.npy")):
+        _shared[name] = np.load(os.path.join(entry_dir, fname), mmap_mode="r")
+
+def _run_fold(origin, n_jobs):
+    X, y, month_idx = _shared["X"], _shared["y"], _shared["month_idx"]
+    start = np.searchsorted(month_idx, origin, side="left")
+    end = np.searchsorted(month_idx, origin, side="right")
+
+    # Trees are invariant to the RobustScaler's monotone rescaling,
+    # so folds train directly on the raw (memory-mapped) features.
+    model = xgb.XGBRegressor(**{**BEST_PARAMS, "verbosity": 0, "n_jobs": n_jobs})
+    model.fit(X[:start], y[:start])
+    pred = model.predict(X[start:end]).clip(min=0)
+    return origin, start, end, pred
+
+# ─── Driver ───────────────────────────────────────────────────────────────────
+def run_backtest(start_month, workers, lookup_path=LOOKUP_PATH) -> pd.DataFrame:
+    fs = cached_features(CACHE_NAME, [DATASET_PATH], ["burglary_features.py", "dtype_policy.py", build_features], build_features)
+    months = fs.extras["month_idx"]
+
+    first = month_index(pd.Series([pd.Timestamp(start_month)]))[0]
+    origins = [int(m) for m in np.unique(months) if m >= first]
+    if not origins:
+        raise ValueError(f"No months on or after {start_month} to backtest.")
+    print(f"Backtesting {len(origins)} origin months on {workers} worker(s).")
+
+    n_jobs = max(1, (os.cpu_count() or 1) // workers)
+    entry_dir = os.path.join(CACHE_DIR, CACHE_NAME)
+    folds = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(entry_dir,)) as pool:
+        for origin, start, end, pred in pool.map(_run_fold, origins, [n_jobs] * len(origins)):
+            folds.append(pd.DataFrame({
+                "month": origin,
+                "lsoa_code": fs.lsoa_code[start:end],
+                "actual": fs.y[start:end],
+                "predicted": pred,
+            }))
+            print(f"  fold {origin // 12}-{origin % 12 + 1:02d} done ({end - start} LSOAs)")
+
+    res = pd.concat(folds, ignore_index=True)
+    with open(lookup_path) as f:
+        lookup = json.load(f)
+    res["ward_code"] = res["lsoa_code"].map({k.strip(): v["ward_code"] for k, v in lookup.items()})
+
+    res["abs_err"] = (res["predicted"] - res["actual"]).abs()
+    res["sq_err"] = (res["predicted"] - res["actual"]) ** 2
+    table = (
+        res.groupby(["month", "ward_code"])
+        .agg(n_lsoas=("lsoa_code", "size"), actual=("actual", "sum"), predicted=("predicted", "sum"),
+             mae=("abs_err", "mean"), mse=("sq_err", "mean"))
+        .reset_index()
+    )
+    table["rmse"] = np.sqrt(table.pop("mse"))
+    table["month"] = [f"{m // 12}-{m % 12 + 1:02d}" for m in table["month"]]
+    return table
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest: retrain and forecast every origin month.")
+    parser.add_argument("--start", default="2022-01", help="First origin month (YYYY-MM).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parallel fold processes.")
+    parser.add_argument("--lookup", default=LOOKUP_PATH, help="LSOA → ward lookup JSON.")
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    table = run_backtest(args.start, args.workers, args.lookup)
+    table.to_csv(args.output, index=False)
+    print(table.groupby("month")[["mae", "rmse"]].mean().round(3))
+    print(f"Per-month, per-ward metrics saved to {args.output}")
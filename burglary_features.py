@@ -0,0 +1,146 @@
+import pandas as pd
+import numpy as np
+from scipy.stats import entropy
+
+from dtype_policy import apply_dtype_policy, is_feature_dtype
+
+# Shared feature engineering for the training / backtesting scripts.
+DATASET_PATH = "data/XGBoost_ready_dataset.csv"
+
+EXCLUDE_COLS = {
+    "lsoa_code", "month", "year_month", "crime_type",
+    "latitude", "longitude", "burglary_count", "crime_count"
+}
+
+BEST_PARAMS = {
+    'n_estimators': 500,
+    'learning_rate': 0.2194440144154437,
+    'max_depth': 5,
+    'min_child_weight': 3,
+    'subsample': 0.718124691088876,
+    'colsample_bytree': 0.7743729096902522,
+    'gamma': 3.361223663481572,
+    'alpha': 4.578509071143608,
+    'reg_lambda': 1.7898710081745761,
+    'random_state': 42,
+    'eval_metric': 'rmse',
+    'verbosity': 1
+}
+
+# Burglary history columns: lag_<k> is the count k months back, rolling_*_<w>
+# summarise the w months before the row's month
+LAGS = [1, 2, 3, 6, 12]
+WINDOWS = [3, 6, 12]
+
+def _lag_derived(df):
+    df["delta_lag"] = df["lag_1"] - df["lag_2"]
+    df["momentum"] = df["lag_1"] - df["lag_3"]
+    df["crime_per_capita"] = df["lag_1"] / (df["population"] + 1)
+
+def add_burglary_history(df: pd.DataFrame) -> pd.DataFrame:
+    """(Re)compute every lag and rolling burglary column, plus those derived from the lags.
+
+    `df` must be sorted by lsoa_code and month. Rows with an unknown
+    burglary_count (a month to forecast) still get their history columns
+    from the months before them.
+    """
+    grouped = df.groupby("lsoa_code")
+    for lag in LAGS:
+        df[f"lag_{lag}"] = grouped["burglary_count"].shift(lag)
+    for window in WINDOWS:
+        # shift(1) is NaN at the start of every LSOA, so no window spans two LSOAs
+        past = grouped["burglary_count"].shift(1).rolling(window)
+        df[f"rolling_mean_{window}"] = past.mean()
+        df[f"rolling_std_{window}"] = past.std()
+        df[f"rolling_sum_{window}"] = past.sum()
+    _lag_derived(df)
+    return df
+
+def load_dataset(path: str = DATASET_PATH) -> pd.DataFrame:
+    """Read the model-ready dataset, sorted by LSOA and month."""
+    df = pd.read_csv(path, low_memory=False)
+    df["month"] = pd.to_datetime(df["month"])
+    df["year_month"] = df["month"].dt.to_period("M")
+    df = df[df["burglary_count"].notna() & (df["burglary_count"] >= 0)].copy()
+    df.sort_values(["lsoa_code", "month"], inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    return apply_dtype_policy(df)
+
+# months since last burglary
+def time_since_burglary(series):
+    last_seen = -1
+    result = []
+    for val in series:
+        if val > 0:
+            last_seen = 0
+        elif last_seen >= 0:
+            last_seen += 1
+        result.append(last_seen if last_seen >= 0 else np.nan)
+    return result
+
+def add_model_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the time, interaction and entropy features the XGBoost model is trained on."""
+    # add time features
+    for lag in [1, 3, 6, 12]:
+        col = f"crime_count_pct_change_{lag}m"
+        df[col] = df.groupby("lsoa_code")["crime_count"].pct_change(lag)
+        df[col] = df[col].replace([np.inf, -np.inf], np.nan).fillna(0)
+
+    # Derived features
+    _lag_derived(df)
+    df["stop_rate"] = df["stop_and_search_count"] / (df["population"] + 1)
+    df["log_pop"] = np.log1p(df["population"])
+
+    df["month_num"] = df["month"].dt.month
+    df["month_sin"] = np.sin(2 * np.pi * df["month_num"] / 12)
+    df["month_cos"] = np.cos(2 * np.pi * df["month_num"] / 12)
+    df["quarter"] = df["month"].dt.quarter
+    df["is_holiday_season"] = df["month_num"].isin([11, 12]).astype(int)
+
+    if "crime_count_lag_1m" not in df.columns:
+        df["crime_count_lag_1m"] = df.groupby("lsoa_code")["crime_count"].shift(1).fillna(0)
+
+    if "crime_count_lag_3m" not in df.columns:
+        df["crime_count_lag_3m"] = df.groupby("lsoa_code")["crime_count"].shift(3).fillna(0)
+
+    # add interaction features
+    df["lag1_crime_x_pop"] = df["crime_count_lag_1m"] * df["population"]
+    df["lag3_crime_x_imd"] = df["crime_count_lag_3m"] * df["imd_decile_2019"].astype(float)
+
+    df["crime_volatility_3m"] = (
+        df.groupby("lsoa_code")["crime_count"]
+        .transform(lambda x: x.rolling(3, min_periods=1).std())
+        .fillna(0)
+    )
+
+    crime_types = [c for c in df.columns if c.startswith("crime_") and c.endswith("_count") and c != "burglary_count"]
+    crime_data = df[crime_types].to_numpy()
+
+    # Normalize rows (avoid division by zero)
+    row_sums = crime_data.sum(axis=1, keepdims=True)
+    row_sums[row_sums == 0] = 1  # to avoid division by zero
+    prob_matrix = crime_data / row_sums
+
+    # Compute entropy for each row
+    df["crime_entropy"] = entropy(prob_matrix.T, base=np.e)
+
+    df["months_since_burglary"] = df.groupby("lsoa_code")["burglary_count"].transform(time_since_burglary).fillna(100)
+
+    # extended interactions
+    df["lag1_x_entropy"] = df["crime_count_lag_1m"] * df["crime_entropy"]
+    df["lag3_x_entropy"] = df["crime_count_lag_3m"] * df["crime_entropy"]
+
+    df["entropy_x_sin"] = df["crime_entropy"] * df["month_sin"]
+    df["entropy_x_cos"] = df["crime_entropy"] * df["month_cos"]
+
+    df["entropy_x_imd2019"] = df["crime_entropy"] * df["imd_decile_2019"].astype(float)
+    df["volatility_x_sin"] = df["crime_volatility_3m"] * df["month_sin"]
+    df["volatility_x_cos"] = df["crime_volatility_3m"] * df["month_cos"]
+
+    df["stop_x_imd2019"] = df["stop_and_search_count"] * df["imd_decile_2019"].astype(float)
+    df["imd2019_x_msb"] = df["imd_decile_2019"].astype(float) * df["months_since_burglary"]
+    return apply_dtype_policy(df)
+
+def feature_columns(df: pd.DataFrame) -> list:
+    """Numeric model inputs, in column order."""
+    return [c for c in df.columns if c not in EXCLUDE_COLS and is_feature_dtype(df[c])]
@@ -16,7 +16,7 @@ document.getElementById('police-btn').onclick = () =>
 
 // 2) Seasonal Chart (bar per month)
 const ctx2 = document.getElementById('seasonalChart').getContext('2d');
-fetch('data/seasonal_counts.json')          // you need this file: {"Jan":10,"Feb":12,...}
+fetch('data/seasonal_counts.json')          // generated by community_static.py: {"Jan":10,"Feb":12,...}
   .then(r => r.json())
   .then(season => {
     new Chart(ctx2, {
@@ -39,9 +39,18 @@ L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
   attribution: '&copy; OpenStreetMap contributors'
 }).addTo(recentMap);
 
-fetch('data/ward_6months.json')   // you need to prepare this GeoJSON
+// colour classes: `breaks` are the class boundaries written by community_static.py
+const PALETTE = ['#fff5eb', '#fdd0a2', '#fd8d3c', '#d94801', '#7f2704'];
+let breaks = [];
+const getColor = count => {
+  const i = breaks.findIndex(b => count <= b);
+  return PALETTE[i === -1 ? breaks.length : i];
+};
+
+fetch('data/ward_6months.json')   // generated by community_static.py
   .then(r => r.json())
   .then(geojson => {
+    breaks = geojson.breaks || [];
     L.geoJSON(geojson, {
       style: f => ({
         fillColor: getColor(f.properties.count),
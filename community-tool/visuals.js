@@ -1,6 +1,6 @@
 /* ---------- config ---------- */
-const CRIME_CSV = "/police-dashboard/api/crime-data";
-const LOOKUP_JSON = "/police-dashboard/api/lookup";
+// ward series, London mean and LSOA rankings, pre-aggregated on the server
+const AGGREGATES_JSON = "/police-dashboard/api/community";
 
 /* ---------- tiny helpers ---------- */
 const $ = (id) => document.getElementById(id);
@@ -10,30 +10,12 @@ const showError = (msg) => {
 };
 const clearError = () => ($("error").textContent = "");
 
-const minusMonths = (ym, n) => {
-  const [Y, M] = ym.split("-").map(Number);
-  const d = new Date(Y, M - 1 - n);
-  return d.toISOString().slice(0, 7);
-};
-function* monthRange(start, end) {
-  let [ys, ms] = start.split("-").map(Number);
-  const [ye, me] = end.split("-").map(Number);
-  while (ys < ye || (ys === ye && ms <= me)) {
-    yield `${ys}-${String(ms).padStart(2, "0")}`;
-    ms++;
-    if (ms > 12) {
-      ms = 1;
-      ys++;
-    }
-  }
-}
-
 /* ---------- data containers ---------- */
 const wardName = new Map(); // Ward→Name
-const wardMonth = new Map(); // "YYYY-MM|Ward"→count
-const lsoaCnt = new Map(); // "Ward|LSOA"→count
-let monthsArr = [],
-  londonMean = {};
+let monthsArr = [], // "YYYY-MM", 12 months ending 3 months before the latest
+  londonMean = [], // per month, mean over wards with burglaries
+  wardSeries = {}, // Ward→[count per month]
+  lsoaRanking = {}; // Ward→[[LSOA, count], …] sorted by count
 
 /* ---------- 0. simple tab switch ---------- */
 $("btn-dash").onclick = () => {
@@ -50,110 +32,24 @@ function showTab(tab) {
   $("btn-feedback").classList.toggle("active", tab === "feedback");
 }
 
-/* ---------- 1. load lookup ---------- */
-let lsoaToWard = {};
-fetch(LOOKUP_JSON)
-  .then((res) => res.json())
-  .then((json) => {
-    Object.entries(json).forEach(([lsoa, ward]) => {
-      lsoaToWard[lsoa.trim()] = ward.ward_code; // ← trim here
-      if (!wardName.has(ward.ward_code)) {
-        wardName.set(ward.ward_code, ward.ward_name);
-      }
-    });
-    if (!wardName.size) return showError("Lookup JSON is empty or malformed.");
-    loadCrime();
+/* ---------- 1. load aggregates ---------- */
+fetch(AGGREGATES_JSON)
+  .then((res) => {
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    return res.json();
   })
-  .catch((err) => showError("Lookup JSON fetch failed: " + err.message));
-
-/* ---------- 2. load crime CSV (fetch → parse) ---------- */
-async function loadCrime() {
-  try {
-    const resp = await fetch(CRIME_CSV);
-    if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
-    const csvText = await resp.text();
-
-    const parseRes = Papa.parse(csvText, {
-      header: true,
-      skipEmptyLines: true,
-      transformHeader: (h) => h.trim().toLowerCase().replace(/\s+/g, "_"), // "month", "lsoa_code"
-    });
-
-    const rows = [];
-    let maxMonth = null;
-
-    parseRes.data.forEach((r) => {
-      const rawMonth = (r.month || "").trim(); // e.g. "2024-3", "2024-03-01"
-      const mMatch = /^(\d{4})[-/](\d{1,2})/.exec(rawMonth);
-      if (!mMatch) return; // skip bad rows
-      const ym = `${mMatch[1]}-${mMatch[2].padStart(2, "0")}`; // → "YYYY-MM"
-
-      maxMonth = !maxMonth || ym > maxMonth ? ym : maxMonth;
-
-      rows.push({
-        ym,
-        lsoa: (r.lsoa_code || "").trim(),
-        burg: Number(r.burglary_count ?? r.burglary ?? 0), // ← burglary total in that row
-      });
-    });
-
-    if (!rows.length)
-      return showError("CSV parsed but no usable rows were found.");
-
-    aggregate(rows, maxMonth);
-  } catch (err) {
-    showError("Crime CSV load failed: " + err.message);
-  }
-}
-
-/* ---------- 3. aggregate ---------- */
-function aggregate(rows, maxM) {
-  /* 1. define the 12-month window (skip the most-recent 3 months) */
-  const end = minusMonths(maxM, 3); // e.g. "2025-02"
-  const start = minusMonths(end, 11); // 11 months earlier
-  const months = [...monthRange(start, end)]; // chronological array
-
-  monthsArr = months; // expose to the charts
-
-  /* 2. start fresh each time */
-  wardMonth.clear();
-  lsoaCnt.clear();
-  londonMean = {};
-
-  /* 3. tally counts */
-  rows.forEach(({ ym, lsoa, burg }) => {
-    if (!months.includes(ym)) return; // outside our 12-month range
-    const ward = lsoaToWard[lsoa];
-    if (!ward) return; // unknown LSOA
-
-    const wmKey = `${ym}|${ward}`;
-    wardMonth.set(wmKey, (wardMonth.get(wmKey) || 0) + burg); // use burglary count
-
-    const lwKey = `${ward}|${lsoa}`;
-    lsoaCnt.set(lwKey, (lsoaCnt.get(lwKey) || 0) + burg);
-  });
-
-  /* 4. compute the London mean for each month */
-  months.forEach((m) => {
-    let total = 0,
-      wardsWithData = 0;
-
-    wardName.forEach((_, w) => {
-      const v = wardMonth.get(`${m}|${w}`) || 0;
-      if (v > 0) {
-        total += v;
-        wardsWithData++;
-      }
-    });
-
-    londonMean[m] = wardsWithData ? total / wardsWithData : 0;
-  });
-
-  /* 5. (re)draw the UI */
-  buildUI();
-}
+  .then((data) => {
+    Object.entries(data.wards).forEach(([code, name]) => wardName.set(code, name));
+    if (!wardName.size) return showError("Aggregates JSON has no wards.");
+    monthsArr = data.months;
+    londonMean = data.london_mean;
+    wardSeries = data.ward_series;
+    lsoaRanking = data.lsoa_ranking;
+    buildUI();
+  })
+  .catch((err) => showError("Aggregates fetch failed: " + err.message));
 
-/* ---------- 4. UI + Plotly ---------- */
+/* ---------- 2. UI + Plotly ---------- */
 function buildUI() {
   const sel = $("wardSel");
   wardName.forEach((name, code) => {
@@ -170,11 +66,11 @@ function buildUI() {
 
 // ── rebuild the two plots with auto-sized Y-axes ──
 function render(ward) {
-  const wardSeries = monthsArr.map((m) => wardMonth.get(`${m}|${ward}`) || 0);
-  const londonSer = monthsArr.map((m) => londonMean[m] || 0);
+  const wardSer = wardSeries[ward] || monthsArr.map(() => 0);
+  const londonSer = londonMean;
 
   /* ---------- line chart ---------- */
-  const maxLine = Math.max(...wardSeries, ...londonSer, 1); // avoid 0-height axis
+  const maxLine = Math.max(...wardSer, ...londonSer, 1); // avoid 0-height axis
   Plotly.newPlot(
     "linePlot",
     [
@@ -187,7 +83,7 @@ function render(ward) {
       },
       {
         x: monthsArr,
-        y: wardSeries,
+        y: wardSer,
         name: `${ward} total`,
         mode: "lines+markers",
       },
@@ -207,12 +103,7 @@ function render(ward) {
   );
 
   /* ---------- bar chart ---------- */
-  const arr = [];
-  lsoaCnt.forEach((cnt, key) => {
-    const [w, l] = key.split("|");
-    if (w === ward) arr.push([l, cnt]);
-  });
-  arr.sort((a, b) => b[1] - a[1]);
+  const arr = lsoaRanking[ward] || []; // already sorted on the server
 
   const maxBar = Math.max(...arr.map((d) => d[1]), 1);
   Plotly.newPlot(
@@ -0,0 +1,91 @@
+"""
+Chart data for the community tool and plotly_dashboard.py.
+
+Both front ends show, for the 12 months ending 3 months before the latest
+month in the master data: each ward's monthly burglary totals, the London
+mean per ward (over wards with burglaries that month) and each ward's LSOAs
+ranked by burglaries. This script computes them once per data refresh into a
+small JSON file instead of every client re-aggregating the raw CSV.
+
+    python community_aggregates.py
+"""
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+from write_lock import atomic_write_json
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+MASTER_CSV = os.path.join(ROOT_DIR, "data", "crime_fixed_data.csv")
+LOOKUP_JSON = os.path.join(ROOT_DIR, "data", "lsoa_to_ward.json")
+OUTPUT_DIR = os.path.join(ROOT_DIR, "data", "community")
+OUTPUT_JSON = os.path.join(OUTPUT_DIR, "community_aggregates.json")
+
+WINDOW_MONTHS = 12
+SKIP_RECENT_MONTHS = 3
+
+def build_community_aggregates(master_path=MASTER_CSV, lookup_path=LOOKUP_JSON) -> dict:
+    with open(lookup_path, encoding="utf-8") as f:
+        lookup = json.load(f)  # {lsoa: {ward_code, ward_name}}
+    lsoa_ward = {lsoa.strip(): w["ward_code"] for lsoa, w in lookup.items()}
+    ward_names = {w["ward_code"]: w["ward_name"] for w in lookup.values()}
+
+    df = pd.read_csv(master_path, usecols=["lsoa_code", "month", "burglary_count"],
+                     dtype={"lsoa_code": "category"})
+    period = pd.to_datetime(df["month"]).dt.to_period("M")
+    end = period.max() - SKIP_RECENT_MONTHS
+    start = end - (WINDOW_MONTHS - 1)
+    months = pd.period_range(start, end, freq="M")
+
+    ward = df["lsoa_code"].map(lsoa_ward)
+    keep = (period >= start) & (period <= end) & ward.notna()
+    recent = pd.DataFrame({
+        "ward": ward[keep].astype(str),
+        "lsoa": df["lsoa_code"][keep].astype(str),
+        "month": period[keep],
+        "count": df["burglary_count"][keep].fillna(0).astype(np.int64),
+    })
+
+    ward_codes = sorted(ward_names)
+    ward_month = (
+        recent.groupby(["ward", "month"])["count"].sum()
+        .unstack(fill_value=0)
+        .reindex(index=ward_codes, columns=months, fill_value=0)
+    )
+    london_mean = ward_month.where(ward_month > 0).mean().fillna(0)
+
+    lsoa_counts = (
+        recent.groupby(["ward", "lsoa"])["count"].sum()
+        .reset_index()
+        .sort_values(["ward", "count", "lsoa"], ascending=[True, False, True])
+    )
+    lsoa_ranking = {
+        w: [[l, int(c)] for l, c in zip(g["lsoa"], g["count"])]
+        for w, g in lsoa_counts.groupby("ward", sort=False)
+    }
+
+    return {
+        "months": [str(m) for m in months],
+        "wards": {c: ward_names[c] for c in ward_codes},
+        "london_mean": [round(float(v), 3) for v in london_mean],
+        "ward_series": {c: [int(v) for v in row] for c, row in zip(ward_codes, ward_month.to_numpy())},
+        "lsoa_ranking": lsoa_ranking,
+    }
+
+def write_community_aggregates(master_path=MASTER_CSV, lookup_path=LOOKUP_JSON, output_path=OUTPUT_JSON):
+    data = build_community_aggregates(master_path, lookup_path)
+    return atomic_write_json(output_path, data, separators=(",", ":"))
+
+def ensure_community_aggregates(master_path=MASTER_CSV, lookup_path=LOOKUP_JSON, output_path=OUTPUT_JSON):
+    """Rebuild the JSON if it is missing or older than one of its inputs."""
+    if os.path.exists(output_path):
+        built = os.path.getmtime(output_path)
+        if all(os.path.getmtime(p) <= built for p in (master_path, lookup_path)):
+            return output_path
+    return write_community_aggregates(master_path, lookup_path, output_path)
+
+if __name__ == "__main__":
+    path = write_community_aggregates()
+    print(f"Community aggregates written to {path}")
@@ -0,0 +1,188 @@
+"""
+Static data files for the public community portal (community-tool/index.html):
+
+    community-tool/data/seasonal_counts.json  {"Jan": avg London burglaries, ...}
+    community-tool/data/ward_6months.json     ward GeoJSON (simplified) with the
+                                              burglary count of the last 6 months
+
+Monthly totals are kept in data/cache/community_static.json, so a run only
+parses the rows appended to the master CSV since the last run (uploads append)
+and aggregates months it has not seen yet. A changed LSOA → ward lookup or
+--full recomputes every month. Files are only rewritten when their content
+changes.
+
+    python community_static.py [--full]
+"""
+import io
+import os
+import sys
+import json
+import hashlib
+import argparse
+import calendar
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(ROOT_DIR, "Police_dashboard"))
+from geometry import load_geojson
+from feature_cache import file_digest
+from write_lock import atomic_write_json, atomic_write_bytes
+
+MASTER_CSV = os.path.join(ROOT_DIR, "data", "crime_fixed_data.csv")
+LOOKUP_JSON = os.path.join(ROOT_DIR, "data", "lsoa_to_ward.json")
+WARD_GEOJSON = os.path.join(ROOT_DIR, "data", "wards.geojson")
+STATE_PATH = os.path.join(ROOT_DIR, "data", "cache", "community_static.json")
+OUTPUT_DIR = os.path.join(ROOT_DIR, "community-tool", "data")
+SEASONAL_JSON = os.path.join(OUTPUT_DIR, "seasonal_counts.json")
+WARD_6M_JSON = os.path.join(OUTPUT_DIR, "ward_6months.json")
+
+RECENT_MONTHS = 6
+COLOR_CLASSES = 5
+TAIL_BYTES = 1 << 16  # bytes before the last-read offset that must be unchanged to read only what follows
+
+# ─── Monthly totals (incremental) ─────────────────────────────────────────────
+def load_state(full=False, lookup_hash=None):
+    """Saved totals; empty when `full`, missing or aggregated with another ward lookup."""
+    if not full and os.path.exists(STATE_PATH):
+        with open(STATE_PATH, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("lookup_hash") == lookup_hash:
+            return state
+        print("LSOA → ward lookup changed, recomputing every month.")
+    return {"months": {}, "lookup_hash": lookup_hash}
+
+def _window_digest(f, end):
+    start = max(end - TAIL_BYTES, 0)
+    f.seek(start)
+    return hashlib.sha256(f.read(end - start)).hexdigest()
+
+def _unread_rows(master_path, seen):
+    """CSV source for the rows of `master_path` not read yet, and the new read marker.
+
+    When the bytes just before the last-read offset are unchanged the file has
+    only grown, so the header plus what follows the offset is enough; any other
+    change means reading the whole file. None when the file is untouched.
+    """
+    st = os.stat(master_path)
+    stamp = [st.st_mtime_ns, st.st_size]
+    if seen.get("stamp") == stamp:
+        return None, seen
+    with open(master_path, "rb") as f:
+        marker = {"stamp": stamp, "offset": st.st_size, "tail": _window_digest(f, st.st_size)}
+        offset = seen.get("offset", 0)
+        if not 0 < offset <= st.st_size or _window_digest(f, offset) != seen.get("tail"):
+            return master_path, marker
+        f.seek(0)
+        header = f.readline()
+        f.seek(offset)
+        return io.BytesIO(header + f.read()), marker
+
+def update_monthly_totals(state, master_path=MASTER_CSV, lookup_path=LOOKUP_JSON):
+    """Add London and per-ward totals for months not yet in `state`. Returns the new months."""
+    source, state["master"] = _unread_rows(master_path, state.get("master", {}))
+    if source is None:
+        return []
+    with open(lookup_path, encoding="utf-8") as f:
+        lsoa_ward = {lsoa.strip(): w["ward_code"] for lsoa, w in json.load(f).items()}
+
+    df = pd.read_csv(source, usecols=["lsoa_code", "month", "burglary_count"],
+                     dtype={"lsoa_code": "category"})
+    month = pd.to_datetime(df["month"]).dt.strftime("%Y-%m")
+    new = ~month.isin(state["months"])
+    if not new.any():
+        return []
+
+    rows = pd.DataFrame({
+        "month": month[new],
+        "ward": df["lsoa_code"][new].map(lsoa_ward).astype(object),
+        "count": df["burglary_count"][new].fillna(0).astype(np.int64),
+    })
+    london = rows.groupby("month")["count"].sum()
+    by_ward = rows.dropna(subset=["ward"]).groupby(["month", "ward"])["count"].sum()
+    by_ward = {m: g.droplevel(0) for m, g in by_ward.groupby(level=0)}
+
+    for m, total in london.items():
+        state["months"][m] = {
+            "total": int(total),
+            "wards": {w: int(c) for w, c in by_ward.get(m, {}).items() if c},
+        }
+    return sorted(london.index)
+
+def save_state(state):
+    atomic_write_json(STATE_PATH, state, separators=(",", ":"))
+
+# ─── Outputs ──────────────────────────────────────────────────────────────────
+def seasonal_counts(state) -> dict:
+    """Average London burglaries per calendar month, over all years present."""
+    totals = pd.Series({m: v["total"] for m, v in state["months"].items()}, dtype=float)
+    by_month = totals.groupby(pd.to_datetime(totals.index).month).mean()
+    return {calendar.month_abbr[m]: round(float(by_month[m]), 1) for m in range(1, 13) if m in by_month.index}
+
+def ward_recent_geojson(state, ward_geo, n_months=RECENT_MONTHS) -> dict:
+    """Ward FeatureCollection with the summed burglaries of the last `n_months` months."""
+    months = sorted(state["months"])[-n_months:]
+    counts = {}
+    for m in months:
+        for w, c in state["months"][m]["wards"].items():
+            counts[w] = counts.get(w, 0) + c
+
+    features = [
+        {
+            "type": "Feature",
+            "properties": {
+                "code": f["properties"]["GSS_Code"],
+                "name": f["properties"]["Name"],
+                "count": counts.get(f["properties"]["GSS_Code"], 0),
+            },
+            "geometry": f["geometry"],
+        }
+        for f in ward_geo["features"]
+    ]
+    values = np.array([f["properties"]["count"] for f in features]) if features else np.zeros(1)
+    breaks = np.quantile(values, np.linspace(0, 1, COLOR_CLASSES + 1)[1:-1])
+    return {
+        "type": "FeatureCollection",
+        "months": months,
+        "breaks": [round(float(b), 1) for b in breaks],  # colour class boundaries for the map
+        "features": features,
+    }
+
+def write_if_changed(path, data) -> bool:
+    text = json.dumps(data, separators=(",", ":"))
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            if f.read() == text:
+                return False
+    atomic_write_bytes(path, text.encode("utf-8"))
+    return True
+
+def build_community_static(full=False):
+    state = load_state(full, file_digest(LOOKUP_JSON))
+    new_months = update_monthly_totals(state)
+    st = os.stat(WARD_GEOJSON)
+    geometry_stamp = [st.st_mtime_ns, st.st_size]
+    if new_months:
+        print(f"Aggregated {len(new_months)} new month(s): {new_months[0]} … {new_months[-1]}")
+    elif (state.get("geometry_stamp") == geometry_stamp
+          and os.path.exists(SEASONAL_JSON) and os.path.exists(WARD_6M_JSON)):
+        print("No new months, community files are up to date.")
+        save_state(state)  # remember how far the master has been read
+        return
+
+    # simplified, rounded ward boundaries shared with the police dashboard (data/cache/geo)
+    ward_geo = load_geojson("ward", WARD_GEOJSON, "london")
+
+    for path, data in ((SEASONAL_JSON, seasonal_counts(state)),
+                       (WARD_6M_JSON, ward_recent_geojson(state, ward_geo))):
+        print(f"{'Wrote' if write_if_changed(path, data) else 'Unchanged'} {os.path.relpath(path, ROOT_DIR)}")
+
+    state["geometry_stamp"] = geometry_stamp
+    save_state(state)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the static JSON files of the community portal.")
+    parser.add_argument("--full", action="store_true", help="Recompute every month instead of only new ones.")
+    args = parser.parse_args()
+    build_community_static(full=args.full)
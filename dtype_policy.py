@@ -0,0 +1,41 @@
+"""
+Memory-lean dtypes for the master data and the model feature frames.
+
+    deciles, flags, month/quarter  → int8
+    other whole-number columns     → int32 (counts; wide enough that
+                                     count × population products cannot overflow)
+    other floats                   → float32
+    text columns (names, codes)    → category, except the join keys
+"""
+import numpy as np
+import pandas as pd
+
+KEY_COLS = ("lsoa_code", "ward_code")
+SMALL_INT_COLS = ("month_num", "quarter")
+SMALL_INT_PREFIXES = ("is_",)
+SMALL_INT_SUFFIXES = ("_decile_2019",)
+
+def _is_small_int(col: str) -> bool:
+    return col in SMALL_INT_COLS or col.startswith(SMALL_INT_PREFIXES) or col.endswith(SMALL_INT_SUFFIXES)
+
+def _is_whole(s: pd.Series) -> bool:
+    values = s.to_numpy()
+    return bool(s.notna().all() and np.all(np.mod(values, 1) == 0))
+
+def apply_dtype_policy(df: pd.DataFrame, key_cols=KEY_COLS) -> pd.DataFrame:
+    """Downcast `df` in place following the policy above and return it."""
+    for col in df.columns:
+        s = df[col]
+        if col in key_cols or pd.api.types.is_bool_dtype(s) or isinstance(s.dtype, pd.CategoricalDtype):
+            continue
+        if s.dtype == object:
+            df[col] = s.astype("category")
+        elif pd.api.types.is_integer_dtype(s) or (pd.api.types.is_float_dtype(s) and _is_whole(s)):
+            df[col] = s.astype(np.int8 if _is_small_int(col) and s.abs().max() < 128 else np.int32)
+        elif pd.api.types.is_float_dtype(s):
+            df[col] = s.astype(np.float32)
+    return df
+
+def is_feature_dtype(s: pd.Series) -> bool:
+    """Numeric model input (any int/float width, not bool or category)."""
+    return pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s)
@@ -0,0 +1,148 @@
+"""
+On-disk cache for model feature matrices.
+
+A cache entry is a folder of .npy files (float32 X, target y, row index
+lsoa_code / month, optional numeric extra columns) plus a meta.json holding a
+lineage hash of the input files and the code that built them. When the
+lineage still matches, later runs memory-map the arrays instead of
+recomputing every derived feature from CSV.
+
+Each version is written to its own folder, data/cache/<name>/<lineage>/,
+renamed into place in one step and then published by swapping in
+<name>/current.json, so processes that still have the previous arrays
+memory-mapped never see them rewritten. The previous version is kept one
+generation; older ones are removed.
+"""
+import os
+import json
+import hashlib
+import shutil
+import inspect
+from collections import namedtuple
+
+import numpy as np
+
+from write_lock import WRITE_LOCK, atomic_write, atomic_write_json
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cache")
+
+FeatureSet = namedtuple("FeatureSet", ["X", "y", "lsoa_code", "month", "features", "extras"])
+
+# ─── Hashing ──────────────────────────────────────────────────────────────────
+def file_digest(path, chunk_size=1 << 20) -> str:
+    """sha256 of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _code_text(code) -> str:
+    if callable(code):
+        return inspect.getsource(code)
+    with open(code, encoding="utf-8") as f:
+        return f.read()
+
+def lineage_hash(input_paths, code, known_inputs=None):
+    """Hash of the input files' contents and of the building code.
+
+    `code` is a list of source file paths and/or functions. `known_inputs`
+    maps path → {size, mtime_ns, sha256} from a previous run, so unchanged
+    files are not re-read. Returns (hash, inputs) with the refreshed stats.
+    """
+    known_inputs = known_inputs or {}
+    inputs = {}
+    h = hashlib.sha256()
+    for path in input_paths:
+        st = os.stat(path)
+        prev = known_inputs.get(path)
+        if prev and prev["size"] == st.st_size and prev["mtime_ns"] == st.st_mtime_ns:
+            digest = prev["sha256"]
+        else:
+            digest = file_digest(path)
+        inputs[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        h.update(digest.encode())
+    for c in code:
+        h.update(_code_text(c).encode("utf-8"))
+    return h.hexdigest(), inputs
+
+# ─── Read / write ─────────────────────────────────────────────────────────────
+def _read_meta(entry_dir):
+    """Meta of the published version of an entry (its folder name under "version"), or None."""
+    meta_path = os.path.join(entry_dir, "current.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_version(tmp, fs: FeatureSet, meta):
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "X.npy"), np.ascontiguousarray(fs.X, dtype=np.float32))
+    if fs.y is not None:
+        np.save(os.path.join(tmp, "y.npy"), np.asarray(fs.y, dtype=np.float32))
+    np.save(os.path.join(tmp, "lsoa_code.npy"), np.asarray(fs.lsoa_code, dtype=str))
+    np.save(os.path.join(tmp, "month.npy"), np.asarray(fs.month, dtype="datetime64[ns]"))
+    for col, values in (fs.extras or {}).items():
+        # extras keep their own numeric dtype (e.g. int32 month indices)
+        np.save(os.path.join(tmp, f"extra_{col}.npy"), np.asarray(values))
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+def save_features(name, lineage, inputs, fs: FeatureSet, cache_dir=CACHE_DIR):
+    entry_dir = os.path.join(cache_dir, name)
+    version = lineage[:16]
+    meta = {
+        "version": version,
+        "lineage": lineage,
+        "inputs": inputs,
+        "features": list(fs.features),
+        "has_target": fs.y is not None,
+        "extras": list(fs.extras or {}),
+        "shape": list(np.shape(fs.X)),
+    }
+
+    with WRITE_LOCK:
+        previous = (_read_meta(entry_dir) or {}).get("version")
+        if not os.path.exists(os.path.join(entry_dir, version, "meta.json")):
+            atomic_write(os.path.join(entry_dir, version), _write_version, fs, meta)
+        atomic_write_json(os.path.join(entry_dir, "current.json"), meta, indent=2)
+
+        for old in os.listdir(entry_dir):
+            path = os.path.join(entry_dir, old)
+            if old in ("current.json", version, previous) or old.endswith(".tmp"):
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):  # arrays of the old single-folder layout
+                os.remove(path)
+
+def load_features(name, lineage, cache_dir=CACHE_DIR):
+    """Memory-map a cache entry if its lineage matches, else return None."""
+    meta = _read_meta(os.path.join(cache_dir, name))
+    if meta is None or meta["lineage"] != lineage:
+        return None
+    entry_dir = os.path.join(cache_dir, name, meta["version"])
+
+    load = lambda f: np.load(os.path.join(entry_dir, f), mmap_mode="r")
+    return FeatureSet(
+        X=load("X.npy"),
+        y=load("y.npy") if meta["has_target"] else None,
+        lsoa_code=load("lsoa_code.npy"),
+        month=load("month.npy"),
+        features=meta["features"],
+        extras={col: load(f"extra_{col}.npy") for col in meta["extras"]},
+    )
+
+def cached_features(name, input_paths, code, build, cache_dir=CACHE_DIR) -> FeatureSet:
+    """Return the cached FeatureSet for `name`, calling `build()` only when inputs or code changed."""
+    meta = _read_meta(os.path.join(cache_dir, name)) or {}
+    lineage, inputs = lineage_hash(input_paths, code, meta.get("inputs"))
+
+    fs = load_features(name, lineage, cache_dir)
+    if fs is not None:
+        print(f"Feature cache hit for '{name}' ({fs.X.shape[0]} rows).")
+        return fs
+
+    print(f"Feature cache miss for '{name}', building features...")
+    save_features(name, lineage, inputs, build(), cache_dir)
+    return load_features(name, lineage, cache_dir)
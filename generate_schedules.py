@@ -0,0 +1,213 @@
+"""
+Patrol schedules from the next-month burglary forecast:
+
+    data/allocations/All_wards_patrol_schedule.csv
+        officer, ward_code, ward_name, shift, lsoa_code, predicted_burglary,
+        visit_order, route_km
+
+Each ward's LSOAs are shared among its officers so that every officer carries
+about the same predicted burglary load (greedy longest-processing-time: LSOAs
+in decreasing risk, each to the least-loaded officer with room left). All
+wards are solved together: round r hands the r-th riskiest LSOA of every ward
+to that ward's least-loaded officer in one vectorised step, so a London
+re-plan is a few dozen numpy operations.
+
+Officers per ward come from data/allocations/officers_per_ward.csv
+(ward_code, officers) when it exists, --officers otherwise. A ward's officers
+are split over SHIFTS as evenly as possible (officer n works shift n mod 3),
+so with 4 officers one shift has two. The LSOAs are first shared among the
+ward's shifts, balancing the load per officer on duty, then among the
+officers of each shift; both steps use the same allocator. Officers cover at
+most --max-lsoas LSOAs each; when a ward has too few officers its lowest-risk
+LSOAs stay unassigned. Each officer's LSOAs are then put in visiting order
+(patrol_routes.py).
+
+The CSV is also split into one parquet file per ward under
+data/allocations/by_ward/<version>/, published through by_ward/index.json,
+for the dashboard's drill-down and per-ward downloads. Both are written
+under WRITE_LOCK, so a dashboard prediction and a pipeline run cannot
+interleave.
+
+    python generate_schedules.py [--officers N] [--max-lsoas N] [--workers N]
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from patrol_routes import MASTER_CSV, lsoa_centroids, add_routes
+from write_lock import WRITE_LOCK, atomic_write, atomic_write_json
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+FORECAST_CSV = os.path.join(ROOT_DIR, "data", "burglary_next_month_forecast.csv")
+LOOKUP_JSON = os.path.join(ROOT_DIR, "data", "lsoa_to_ward.json")
+ALLOC_DIR = os.path.join(ROOT_DIR, "data", "allocations")
+OFFICERS_CSV = os.path.join(ALLOC_DIR, "officers_per_ward.csv")
+OUTPUT_CSV = os.path.join(ALLOC_DIR, "All_wards_patrol_schedule.csv")
+PARTITION_DIR = os.path.join(ALLOC_DIR, "by_ward")
+
+DEFAULT_OFFICERS = 4
+MAX_LSOAS_PER_OFFICER = 8
+SHIFTS = ["Early 07:00-15:00", "Late 15:00-23:00", "Night 23:00-07:00"]
+
+# ─── Allocation ───────────────────────────────────────────────────────────────
+def allocate(ward_idx, risk, officers, max_lsoas=MAX_LSOAS_PER_OFFICER, size=None):
+    """Officer number within its ward (0-based) for every LSOA, -1 when unassigned.
+
+    ward_idx: ward index per LSOA, risk: predicted burglaries per LSOA,
+    officers: number of officers per ward index. With `size` (wards x
+    officers) each officer slot stands for that many officers: it takes up
+    to size * max_lsoas LSOAs and is compared by load per officer.
+    """
+    ward_idx = np.asarray(ward_idx, dtype=np.int64)
+    risk = np.asarray(risk, dtype=np.float64)
+    officers = np.asarray(officers, dtype=np.int64)
+    assigned = np.full(len(risk), -1, dtype=np.int64)
+    if not len(risk) or not officers.any():
+        return assigned
+
+    # position of each LSOA in its ward's decreasing-risk order
+    order = np.lexsort((-risk, ward_idx))
+    starts = np.searchsorted(ward_idx[order], np.arange(len(officers)))
+    rank = np.empty(len(risk), dtype=np.int64)
+    rank[order] = np.arange(len(order)) - starts[ward_idx[order]]
+    by_rank = np.argsort(rank, kind="stable")
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(rank))])
+
+    width = int(officers.max())
+    has_officer = np.arange(width) < officers[:, None]
+    size = np.ones((len(officers), width)) if size is None else np.asarray(size, dtype=np.float64)[:, :width]
+    per_officer = np.maximum(size, 1)
+    load = np.zeros((len(officers), width))
+    count = np.zeros((len(officers), width), dtype=np.int64)
+
+    for r in range(len(bounds) - 1):
+        lsoa = by_rank[bounds[r]:bounds[r + 1]]  # at most one LSOA per ward
+        w = ward_idx[lsoa]
+        cand = np.where(has_officer[w] & (count[w] < max_lsoas * size[w]), load[w] / per_officer[w], np.inf)
+        officer = cand.argmin(axis=1)
+        ok = np.isfinite(cand[np.arange(len(w)), officer])
+        lsoa, w, officer = lsoa[ok], w[ok], officer[ok]
+        load[w, officer] += risk[lsoa]
+        count[w, officer] += 1
+        assigned[lsoa] = officer
+    return assigned
+
+def allocate_shifts(ward_idx, risk, officers, max_lsoas=MAX_LSOAS_PER_OFFICER):
+    """Officer number within its ward for every LSOA, -1 when unassigned; officer n works SHIFTS[n % len(SHIFTS)].
+
+    LSOAs are shared among each ward's shifts first, by load per officer on
+    duty, then among the officers of each shift.
+    """
+    ward_idx = np.asarray(ward_idx, dtype=np.int64)
+    risk = np.asarray(risk, dtype=np.float64)
+    officers = np.asarray(officers, dtype=np.int64)
+    n_shifts = len(SHIFTS)
+    on_shift = officers[:, None] // n_shifts + (np.arange(n_shifts) < officers[:, None] % n_shifts)
+
+    shift = allocate(ward_idx, risk, np.minimum(officers, n_shifts), max_lsoas, size=on_shift)
+    ok = shift >= 0
+    within = allocate(ward_idx[ok] * n_shifts + shift[ok], risk[ok], on_shift.ravel(), max_lsoas)
+
+    officer = np.full(len(risk), -1, dtype=np.int64)
+    officer[ok] = np.where(within >= 0, within * n_shifts + shift[ok], -1)
+    return officer
+
+def load_officers(ward_codes, default=DEFAULT_OFFICERS, path=OFFICERS_CSV) -> np.ndarray:
+    """Officers per ward code; blank cells in `path` fall back to `default`."""
+    officers = pd.Series(default, index=ward_codes, dtype=np.int64)
+    if os.path.exists(path):
+        given = pd.read_csv(path, dtype={"ward_code": str}).set_index("ward_code")["officers"]
+        given = given[given.index.isin(officers.index)]
+        numeric = pd.to_numeric(given, errors="coerce")
+        bad = given[(numeric.isna() & given.notna()) | (numeric < 0) | (numeric % 1 > 0)]
+        if len(bad):
+            raise ValueError(f"{path}: officers must be whole numbers >= 0, got "
+                             + ", ".join(f"{w}={v!r}" for w, v in bad.items()))
+        officers[given.index] = numeric.fillna(default).astype(np.int64)
+    return officers.to_numpy()
+
+def build_schedules(forecast_path=FORECAST_CSV, lookup_path=LOOKUP_JSON,
+                    default_officers=DEFAULT_OFFICERS, max_lsoas=MAX_LSOAS_PER_OFFICER) -> pd.DataFrame:
+    with open(lookup_path, encoding="utf-8") as f:
+        lookup = json.load(f)  # {lsoa: {ward_code, ward_name}}
+    lsoa_ward = {lsoa.strip(): w["ward_code"] for lsoa, w in lookup.items()}
+    ward_names = {w["ward_code"]: w["ward_name"] for w in lookup.values()}
+    ward_codes = sorted(ward_names)
+
+    forecast = pd.read_csv(forecast_path, usecols=["lsoa_code", "predicted_burglary"])
+    forecast["lsoa_code"] = forecast["lsoa_code"].str.strip()
+    forecast["ward_code"] = forecast["lsoa_code"].map(lsoa_ward)
+    forecast = forecast.dropna(subset=["ward_code"]).reset_index(drop=True)
+
+    ward_idx = pd.Categorical(forecast["ward_code"], categories=ward_codes).codes
+    officers = load_officers(ward_codes, default_officers)
+    officer = allocate_shifts(ward_idx, forecast["predicted_burglary"].fillna(0), officers, max_lsoas)
+
+    keep = officer >= 0
+    officer = officer[keep]
+    out = forecast[keep].reset_index(drop=True)
+    out["ward_name"] = out["ward_code"].map(ward_names)
+    out["officer"] = out["ward_name"] + "_Officer_" + pd.Series(officer + 1).astype(str)
+    out["shift"] = np.asarray(SHIFTS)[officer % len(SHIFTS)]
+    out["officer_no"] = officer
+    out = out.sort_values(["ward_code", "officer_no", "predicted_burglary"], ascending=[True, True, False])
+    return out[["officer", "ward_code", "ward_name", "shift", "lsoa_code", "predicted_burglary"]].reset_index(drop=True)
+
+# ─── Output ───────────────────────────────────────────────────────────────────
+def partition_schedules(schedules, out_dir=PARTITION_DIR) -> dict:
+    """Write one parquet file per ward into a new version directory and publish it in index.json.
+
+    Readers only follow index.json, so they see either the old partitions or
+    the new ones. The previous version is kept for readers still holding the
+    old index; older ones are removed. Caller holds WRITE_LOCK.
+    """
+    index_path = os.path.join(out_dir, "index.json")
+    previous = None
+    if os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            previous = json.load(f).get("version")
+
+    version = f"v{time.time_ns()}"
+    os.makedirs(os.path.join(out_dir, version))
+    wards = {}
+    for code, part in schedules.groupby("ward_code", sort=False):
+        wards[code] = f"{code}.parquet"
+        part.reset_index(drop=True).to_parquet(os.path.join(out_dir, version, wards[code]), index=False)
+
+    index = {"version": version, "columns": list(schedules.columns), "wards": wards}
+    atomic_write_json(index_path, index)
+
+    for name in os.listdir(out_dir):
+        path = os.path.join(out_dir, name)
+        if name in ("index.json", version, previous):
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+    return index
+
+def write_schedules(output_path=OUTPUT_CSV, master_path=MASTER_CSV, workers=None,
+                    partition_dir=PARTITION_DIR, **kwargs):
+    schedules = add_routes(build_schedules(**kwargs), lsoa_centroids(master_path), workers)
+    with WRITE_LOCK:  # re-entrant: the dashboard already holds it around a prediction
+        atomic_write(output_path, schedules.to_csv, index=False)
+        partition_schedules(schedules, partition_dir)
+    print(f"Scheduled {len(schedules)} LSOAs over {schedules['officer'].nunique()} officers → {output_path}")
+    return output_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Allocate LSOAs to patrol officers from the forecast.")
+    parser.add_argument("--officers", type=int, default=DEFAULT_OFFICERS,
+                        help="Officers per ward when officers_per_ward.csv does not list it.")
+    parser.add_argument("--max-lsoas", type=int, default=MAX_LSOAS_PER_OFFICER,
+                        help="Maximum LSOAs per officer.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes for route ordering (default: one per CPU).")
+    args = parser.parse_args()
+    write_schedules(workers=args.workers, default_officers=args.officers, max_lsoas=args.max_lsoas)
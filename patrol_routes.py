@@ -0,0 +1,123 @@
+"""
+Visiting order for each officer's LSOAs in the patrol schedule.
+
+Every officer's route starts at their riskiest LSOA, is built with nearest
+neighbour and then improved with 2-opt, both on a haversine distance matrix
+of LSOA centroids precomputed per ward. Centroids are the mean crime
+coordinates already stored in the master data. Wards are routed in parallel
+worker processes; LSOAs without coordinates are visited last and add no
+distance.
+
+Used by generate_schedules.py, which adds the visit_order and route_km
+columns to the schedule.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+MASTER_CSV = os.path.join(ROOT_DIR, "data", "crime_fixed_data.csv")
+
+EARTH_RADIUS_KM = 6371.0
+
+def lsoa_centroids(master_path=MASTER_CSV) -> pd.DataFrame:
+    """latitude / longitude per LSOA code (mean of the recorded crime locations)."""
+    df = pd.read_csv(master_path, usecols=["lsoa_code", "latitude", "longitude"])
+    df = df.dropna()
+    df = df[(df["latitude"] != 0) & (df["longitude"] != 0)]
+    return df.groupby(df["lsoa_code"].str.strip())[["latitude", "longitude"]].mean()
+
+def haversine_matrix(lat, lon) -> np.ndarray:
+    """Great-circle distances (km) between all pairs of points."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def nearest_neighbour(dist, start=0) -> np.ndarray:
+    route = [start]
+    seen = np.zeros(len(dist), dtype=bool)
+    seen[start] = True
+    for _ in range(len(dist) - 1):
+        nxt = int(np.where(seen, np.inf, dist[route[-1]]).argmin())
+        route.append(nxt)
+        seen[nxt] = True
+    return np.array(route)
+
+def two_opt(dist, route) -> np.ndarray:
+    """Improve an open path with fixed start by segment reversals until none helps.
+
+    For each i all reversals route[i..j] are scored at once; the best one is
+    applied if it shortens the path.
+    """
+    route = np.array(route)
+    n = len(route)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            a, b = route[i - 1], route[i]
+            c = route[i + 1:]                   # route[j] for j = i+1 … n-1
+            d = np.append(route[i + 2:], -1)    # route[j+1], -1 past the end
+            tail = d >= 0
+            before = dist[a, b] + np.where(tail, dist[c, d], 0)
+            after = dist[a, c] + np.where(tail, dist[b, d], 0)
+            k = int((before - after).argmax())
+            if before[k] - after[k] > 1e-9:
+                route[i:i + k + 2] = route[i:i + k + 2][::-1]
+                improved = True
+    return route
+
+def route_ward(job):
+    """(visit_order, route_km) per row for one ward's schedule rows.
+
+    job: (officer, latitude, longitude) arrays, rows of each officer in
+    decreasing risk.
+    """
+    officer, lat, lon = job
+    dist = haversine_matrix(lat, lon)
+    visit = np.zeros(len(officer), dtype=np.int64)
+    km = np.zeros(len(officer))
+    for o in np.unique(officer):
+        rows = np.flatnonzero(officer == o)
+        located = ~np.isnan(lat[rows])
+        known, unknown = rows[located], rows[~located]
+        length = 0.0
+        if len(known):
+            sub = dist[np.ix_(known, known)]
+            route = two_opt(sub, nearest_neighbour(sub))
+            length = float(sub[route[:-1], route[1:]].sum())
+            known = known[route]
+        visit[np.concatenate([known, unknown])] = np.arange(1, len(rows) + 1)
+        km[rows] = length
+    return visit, km
+
+def add_routes(schedules, centroids, workers=None) -> pd.DataFrame:
+    """`schedules` with visit_order and route_km, rows ordered along each route."""
+    coords = centroids.reindex(schedules["lsoa_code"])
+    lat = coords["latitude"].to_numpy(dtype=np.float64)
+    lon = coords["longitude"].to_numpy(dtype=np.float64)
+    officer = schedules["officer"].to_numpy()
+
+    groups = list(schedules.groupby("ward_code", sort=False).indices.values())
+    jobs = [(officer[idx], lat[idx], lon[idx]) for idx in groups]
+    if workers == 1 or len(jobs) < 2:
+        results = list(map(route_ward, jobs))
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(route_ward, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+
+    visit = np.zeros(len(schedules), dtype=np.int64)
+    km = np.zeros(len(schedules))
+    for idx, (v, k) in zip(groups, results):
+        visit[idx] = v
+        km[idx] = k
+
+    out = schedules.assign(visit_order=visit, route_km=km.round(2))
+    # keep the officers in schedule order, each officer's rows in route order
+    officer_rank = pd.factorize(out["ward_code"] + "|" + out["officer"])[0]
+    return out.iloc[np.lexsort((visit, officer_rank))].reset_index(drop=True)
@@ -1,13 +1,16 @@
 
 from pathlib import Path
-from textwrap import dedent
+from functools import lru_cache
+
+import json
 
-import pandas as pd
 import dash
 from dash import dcc, html, Input, Output
 import plotly.graph_objs as go
 from flask import send_from_directory, Response
 
+from community_aggregates import ensure_community_aggregates, MASTER_CSV, LOOKUP_JSON
+
 ###############################################################################
 # 1 · Paths & basic checks
 ###############################################################################
@@ -16,11 +19,9 @@ DATA_DIR   = BASE_DIR / "data"
 ASSETS_DIR = BASE_DIR / "assets";  ASSETS_DIR.mkdir(exist_ok=True)
 PUBLIC_DIR = BASE_DIR / "public";  IMG_DIR = PUBLIC_DIR / "images"
 
-CRIME_CSV = Path("data\combined_crime_2019-2025.csv")
-LOOKUP_CSV = Path("data\LSOA_(2021)_to_Electoral_Ward_(2024)_to_LAD_(2024)_Best_Fit_Lookup_in_EW.csv")
 FEEDBACK_HTML = BASE_DIR / "feedback.html"
 
-for f in (CRIME_CSV, LOOKUP_CSV, FEEDBACK_HTML):
+for f in (Path(MASTER_CSV), Path(LOOKUP_JSON), FEEDBACK_HTML):
     if not f.exists():
         raise FileNotFoundError(f"Required file missing: {f}")
 
@@ -45,44 +46,21 @@ nav a{color:#bbdefb;margin-left:18px;text-decoration:none}.nav-link.active{color
 ###############################################################################
 # 3 · Load & prep data
 ###############################################################################
-crime_cols = {"Month", "LSOA code", "Crime type"}
-crime_df = pd.read_csv(CRIME_CSV, low_memory=False)
-if not crime_cols.issubset(crime_df.columns):
-    raise KeyError("Crime CSV missing columns: " + ", ".join(crime_cols - set(crime_df.columns)))
-
-lookup_cols = {"LSOA21CD", "WD24CD", "WD24NM"}
-lookup_df = pd.read_csv(LOOKUP_CSV, usecols=list(lookup_cols))
-
-crime_df["Month"] = pd.to_datetime(crime_df["Month"], errors="coerce").dt.to_period("M")
-crime_df = crime_df[crime_df["Crime type"].str.lower() == "burglary"].copy()
-
-crime_df = crime_df.merge(
-    lookup_df.rename(columns={"LSOA21CD": "LSOA code", "WD24CD": "Ward", "WD24NM": "WardName"}),
-    on="LSOA code", how="left"
-)
-
-max_period   = crime_df["Month"].max()
-end_period   = max_period - 3
-start_period = end_period - 11
-recent_df    = crime_df[(crime_df["Month"] >= start_period) & (crime_df["Month"] <= end_period)].copy()
-if recent_df.empty:
+# 12-month window, ward series, London mean and LSOA rankings, shared with the
+# community tool (built by community_aggregates.py once per data refresh)
+with open(ensure_community_aggregates(), encoding="utf-8") as f:
+    aggregates = json.load(f)
+
+months             = aggregates["months"]
+london_mean_series = aggregates["london_mean"]
+if not months:
     raise ValueError("No burglary data in the calculated 12-month window.")
 
-ward_month_counts = (
-    recent_df.groupby(["Month", "Ward", "WardName"], observed=True)
-             .size().rename("count").reset_index()
-)
-london_mean_series = ward_month_counts.groupby("Month", observed=True)["count"].mean().sort_index()
-
 Y_RANGE_LINE = [0, 25]
 Y_RANGE_BAR  = [0, 30]
 
-wards_available = (
-    ward_month_counts[["Ward", "WardName"]].drop_duplicates()
-    .dropna(subset=["Ward"]).sort_values("Ward")
-)
-ward_name_map = dict(zip(wards_available["Ward"], wards_available["WardName"]))
-DEFAULT_WARD  = wards_available["Ward"].iloc[0]
+ward_name_map = aggregates["wards"]
+DEFAULT_WARD  = next(iter(ward_name_map))
 
 ###############################################################################
 # 4 · Dash app – normal two-tab layout
@@ -108,7 +86,7 @@ app.layout = html.Div([
                 html.Label("Select Ward:", style={"fontWeight":"bold","marginRight":"6px"}),
                 dcc.Dropdown(
                     id="ward-dropdown",
-                    options=[{"label":f"{w} – {ward_name_map[w]}", "value":w} for w in wards_available["Ward"]],
+                    options=[{"label":f"{w} – {ward_name_map[w]}", "value":w} for w in ward_name_map],
                     value=DEFAULT_WARD, clearable=False, style={"width":"380px"},
                 ),
                 html.Div([
@@ -135,12 +113,12 @@ app.layout = html.Div([
     Output("bar-chart","figure"),
     Input("ward-dropdown","value"))
 def update_charts(ward):
-    ward_series = (
-        ward_month_counts[ward_month_counts["Ward"] == ward]
-        .set_index("Month")["count"]
-        .reindex(london_mean_series.index, fill_value=0)
-    )
-    months = [m.strftime("%Y-%m") for m in london_mean_series.index.to_timestamp()]
+    return ward_figures(ward)
+
+# one figure pair per ward, built on first request; figures are never mutated
+@lru_cache(maxsize=1024)
+def ward_figures(ward):
+    ward_series = aggregates["ward_series"].get(ward, [0] * len(months))
 
     line_fig = go.Figure([
         go.Scatter(x=months, y=london_mean_series,
@@ -153,13 +131,9 @@ def update_charts(ward):
         margin=dict(l=40,r=20,t=40,b=80), legend=dict(orientation="h", y=1.02, x=1)
     )
 
-    lsoa_counts = (
-        recent_df[recent_df["Ward"] == ward]
-        .groupby("LSOA code", observed=True).size()
-        .sort_values(ascending=False)
-    )
+    lsoa_counts = aggregates["lsoa_ranking"].get(ward, [])
     bar_fig = go.Figure([
-        go.Bar(x=lsoa_counts.index, y=lsoa_counts.values, name="Burglaries")
+        go.Bar(x=[l for l, _ in lsoa_counts], y=[c for _, c in lsoa_counts], name="Burglaries")
     ]).update_layout(
         yaxis=dict(title="Burglaries", range=Y_RANGE_BAR, fixedrange=True),
         xaxis=dict(title="LSOA", tickangle=45, fixedrange=True),
@@ -174,17 +148,17 @@ def update_charts(ward):
 def serve_feedback():               # full feedback page
     return send_from_directory(BASE_DIR, "feedback.html")
 
+@lru_cache(maxsize=2048)
+def chart_html(ward, index):
+    return ward_figures(ward)[index].to_html(full_html=False, include_plotlyjs="cdn")
+
 @server.route("/line-chart")
 def serve_line_chart():             # minimal HTML with Plotly figure
-    fig, _ = update_charts(DEFAULT_WARD)
-    return Response(fig.to_html(full_html=False, include_plotlyjs="cdn"),
-                    mimetype="text/html")
+    return Response(chart_html(DEFAULT_WARD, 0), mimetype="text/html")
 
 @server.route("/bar-chart")
 def serve_bar_chart():
-    _, fig = update_charts(DEFAULT_WARD)
-    return Response(fig.to_html(full_html=False, include_plotlyjs="cdn"),
-                    mimetype="text/html")
+    return Response(chart_html(DEFAULT_WARD, 1), mimetype="text/html")
 
 ###############################################################################
 # 7 · Entrypoint
@@ -210,7 +184,8 @@ NEW  — 2025-06-15
 """
 
 from pathlib import Path
-import pandas as pd
+from functools import lru_cache
+import json
 import dash
 from dash import dcc, html, Input, Output
 import plotly.graph_objs as go
@@ -221,17 +196,17 @@ from flask import (
     jsonify,
 )
 
+from community_aggregates import ensure_community_aggregates, MASTER_CSV, LOOKUP_JSON
+
 # ───────────────────────────── Paths ────────────────────────────────────────
 BASE_DIR   = Path(__file__).resolve().parent
 ASSETS_DIR = BASE_DIR / "assets";  ASSETS_DIR.mkdir(exist_ok=True)
 DATA_DIR   = BASE_DIR / "data"
 PUBLIC_DIR = BASE_DIR / "public";  IMG_DIR = PUBLIC_DIR / "images"
 
-CRIME_CSV = Path("data\combined_crime_2019-2025.csv")
-LOOKUP_CSV = Path("data\LSOA_(2021)_to_Electoral_Ward_(2024)_to_LAD_(2024)_Best_Fit_Lookup_in_EW.csv")
 FEEDBACK_HTML = BASE_DIR / "feedback.html"
 
-for f in (CRIME_CSV, LOOKUP_CSV, FEEDBACK_HTML):
+for f in (Path(MASTER_CSV), Path(LOOKUP_JSON), FEEDBACK_HTML):
     if not f.exists():
         raise FileNotFoundError(f"Required file missing: {f}")
 
@@ -252,35 +227,14 @@ nav a{color:#bbdefb;margin-left:18px;text-decoration:none}.nav-link.active{color
     )
 
 # ─────────────────────── Load & prep data ───────────────────────────────────
-crime_df = pd.read_csv(CRIME_CSV, low_memory=False)
-crime_df["Month"] = pd.to_datetime(crime_df["Month"], errors="coerce").dt.to_period("M")
-crime_df = crime_df[crime_df["Crime type"].str.lower() == "burglary"].copy()
-
-lookup_df = pd.read_csv(
-    LOOKUP_CSV, usecols=["LSOA21CD", "WD24CD", "WD24NM"]
-).rename(columns={"LSOA21CD": "LSOA code", "WD24CD": "Ward", "WD24NM": "WardName"})
-
-crime_df = crime_df.merge(lookup_df, on="LSOA code", how="left")
-
-max_p       = crime_df["Month"].max()
-end_p       = max_p - 3
-start_p     = end_p - 11
-recent_df   = crime_df[(crime_df["Month"] >= start_p) & (crime_df["Month"] <= end_p)].copy()
-
-ward_month_counts = (
-    recent_df.groupby(["Month", "Ward", "WardName"], observed=True)
-             .size().rename("count").reset_index()
-)
-london_mean = ward_month_counts.groupby("Month")["count"].mean().sort_index()
+# pre-aggregated by community_aggregates.py (shared with the community tool)
+with open(ensure_community_aggregates(), encoding="utf-8") as f:
+    aggregates = json.load(f)
 
-wards_df = (
-    ward_month_counts[["Ward", "WardName"]]
-    .drop_duplicates()
-    .dropna(subset=["Ward"])
-    .sort_values("Ward")
-)
-WARD_NAME = dict(zip(wards_df["Ward"], wards_df["WardName"]))
-DEFAULT_WARD = wards_df["Ward"].iloc[0]
+MONTHS       = aggregates["months"]
+london_mean  = aggregates["london_mean"]
+WARD_NAME    = aggregates["wards"]
+DEFAULT_WARD = next(iter(WARD_NAME))
 
 # ───────────────────────── Dash app layout ─────────────────────────────────
 app = dash.Dash(__name__, suppress_callback_exceptions=True, assets_folder=str(ASSETS_DIR))
@@ -304,7 +258,7 @@ app.layout = html.Div([
                 html.Label("Select Ward:", style={"fontWeight":"bold","marginRight":"6px"}),
                 dcc.Dropdown(
                     id="ward-dropdown",
-                    options=[{"label":f"{c} – {WARD_NAME[c]}", "value":c} for c in wards_df["Ward"]],
+                    options=[{"label":f"{c} – {WARD_NAME[c]}", "value":c} for c in WARD_NAME],
                     value=DEFAULT_WARD, clearable=False, style={"width":"380px"},
                 ),
                 html.Div([
@@ -322,14 +276,12 @@ app.layout = html.Div([
 ])
 
 # ───────────────────────── Chart builder ───────────────────────────────────
+# memoized per ward: every dropdown change / chart request after the first is
+# a dictionary lookup (figures are never mutated after building)
+@lru_cache(maxsize=1024)
 def build_figures(ward_code: str):
-    months = [m.strftime("%Y-%m") for m in london_mean.index.to_timestamp()]
-
-    ward_series = (
-        ward_month_counts[ward_month_counts["Ward"] == ward_code]
-        .set_index("Month")["count"]
-        .reindex(london_mean.index, fill_value=0)
-    )
+    months = MONTHS
+    ward_series = aggregates["ward_series"].get(ward_code, [0] * len(MONTHS))
 
     line_fig = go.Figure([
         go.Scatter(x=months, y=london_mean, name="London mean / ward",
@@ -342,14 +294,10 @@ def build_figures(ward_code: str):
         margin=dict(l=40,r=20,t=40,b=80), legend=dict(orientation="h", y=1.02, x=1)
     )
 
-    lsoa_counts = (
-        recent_df[recent_df["Ward"] == ward_code]
-        .groupby("LSOA code", observed=True).size()
-        .sort_values(ascending=False)
-    )
+    lsoa_counts = aggregates["lsoa_ranking"].get(ward_code, [])
 
     bar_fig = go.Figure([
-        go.Bar(x=lsoa_counts.index, y=lsoa_counts.values, name="Burglaries")
+        go.Bar(x=[l for l, _ in lsoa_counts], y=[c for _, c in lsoa_counts], name="Burglaries")
     ]).update_layout(
         yaxis=dict(range=[0,30], title="Burglaries", fixedrange=True),
         xaxis=dict(title="LSOA", tickangle=45, fixedrange=True),
@@ -358,6 +306,11 @@ def build_figures(ward_code: str):
 
     return line_fig, bar_fig
 
+@lru_cache(maxsize=2048)
+def chart_html(ward_code: str, index: int) -> str:
+    """Embeddable HTML of the line (0) or bar (1) chart of a ward."""
+    return build_figures(ward_code)[index].to_html(full_html=False, include_plotlyjs="cdn")
+
 # ───────────────────────── Dash callbacks ──────────────────────────────────
 @app.callback(
     Output("line-chart", "figure"),
@@ -374,22 +327,20 @@ def serve_feedback():
 @server.route("/wards")
 def serve_wards():
     # JSON list for ajax in dashboard.html
-    data = [{"code": c, "name": WARD_NAME[c]} for c in wards_df["Ward"]]
+    data = [{"code": c, "name": WARD_NAME[c]} for c in WARD_NAME]
     return jsonify(data)
 
 @server.route("/line-chart")
 def serve_line_chart():
     ward = request.args.get("ward", DEFAULT_WARD)
-    fig, _ = build_figures(ward if ward in WARD_NAME else DEFAULT_WARD)
-    return Response(fig.to_html(full_html=False, include_plotlyjs="cdn"),
-                    mimetype="text/html")
+    html_ = chart_html(ward if ward in WARD_NAME else DEFAULT_WARD, 0)
+    return Response(html_, mimetype="text/html")
 
 @server.route("/bar-chart")
 def serve_bar_chart():
     ward = request.args.get("ward", DEFAULT_WARD)
-    _, fig = build_figures(ward if ward in WARD_NAME else DEFAULT_WARD)
-    return Response(fig.to_html(full_html=False, include_plotlyjs="cdn"),
-                    mimetype="text/html")
+    html_ = chart_html(ward if ward in WARD_NAME else DEFAULT_WARD, 1)
+    return Response(html_, mimetype="text/html")
 
 # ───────────────────────── Entrypoint ──────────────────────────────────────
 if __name__ == "__main__":
@@ -0,0 +1,227 @@
+"""
+Incremental runner for the data → model → forecast pipeline.
+
+Every stage declares its input files, output files and the code it runs. A
+stage's hash covers the contents of its inputs and code; a stage is skipped
+when that hash matches the last successful run and its outputs still exist.
+Stages whose dependencies are done run in parallel, so independent steps
+(crime files, stop and search, reference data) overlap.
+
+    python run_pipeline.py                  # refresh whatever changed
+    python run_pipeline.py --dry-run        # show what would run
+    python run_pipeline.py --force train    # rerun a stage (and what depends on it)
+"""
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from feature_cache import lineage_hash
+from write_lock import atomic_write_json
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(ROOT_DIR, "data", "cache", "pipeline_state.json")
+LOG_DIR = os.path.join(ROOT_DIR, "data", "cache", "pipeline_logs")
+
+Stage = namedtuple("Stage", ["name", "inputs", "outputs", "command", "code"])
+
+# Inputs may be glob patterns; commands run from the repository root.
+STAGES = [
+    Stage("crime",
+          inputs=["data/2019-to-2025/*.csv"],
+          outputs=["data/combined_crime_2019-2025.csv"],
+          command=["creating_dataset.py", "--stage", "crime"],
+          code=["creating_dataset.py"]),
+    Stage("stop_search",
+          inputs=["data/stopandsearch2019.csv", "data/LSOAs.geojson"],
+          outputs=["data/stop_search_counts.csv"],
+          command=["creating_dataset.py", "--stage", "stop_search"],
+          code=["creating_dataset.py"]),
+    Stage("reference",
+          inputs=["data/Mid-2021-LSOA-2021.csv", "data/id-2019-for-london.csv"],
+          outputs=["data/population_lsoa.csv", "data/imd_lsoa.csv"],
+          command=["creating_dataset.py", "--stage", "reference"],
+          code=["creating_dataset.py"]),
+    Stage("dataset",
+          inputs=["data/combined_crime_2019-2025.csv", "data/stop_search_counts.csv",
+                  "data/population_lsoa.csv", "data/imd_lsoa.csv"],
+          outputs=["data/XGBoost_ready_dataset.csv"],
+          command=["creating_dataset.py", "--stage", "dataset"],
+          code=["creating_dataset.py", "burglary_features.py"]),
+    Stage("train",
+          inputs=["data/XGBoost_ready_dataset.csv"],
+          outputs=["models/xgb_burglary_model.pkl", "models/robust_scaler.pkl"],
+          command=["save_XGBoost.py"],
+          code=["save_XGBoost.py", "burglary_features.py", "feature_cache.py", "dtype_policy.py"]),
+    Stage("forecast",
+          inputs=["data/XGBoost_ready_dataset.csv"],
+          outputs=["data/burglary_next_month_forecast.csv", "data/burglary_next_month_contribs.parquet"],
+          command=["XGBoost_with_data.py"],
+          code=["XGBoost_with_data.py", "burglary_features.py", "feature_cache.py", "dtype_policy.py", "Police_dashboard/explain.py"]),
+    Stage("normalize",
+          inputs=["data/burglary_next_month_forecast.csv"],
+          outputs=["data/burglary_next_month_forecast_normalized.csv"],
+          command=["normalization_of_xgboost.py"],
+          code=["normalization_of_xgboost.py"]),
+    Stage("schedules",
+          inputs=["data/burglary_next_month_forecast.csv", "data/lsoa_to_ward.json",
+                  "data/crime_fixed_data.csv",
+                  "data/allocations/officers_per_ward*.csv"],  # optional, hence the glob
+          outputs=["data/allocations/All_wards_patrol_schedule.csv", "data/allocations/by_ward/index.json"],
+          command=["generate_schedules.py"],
+          code=["generate_schedules.py", "patrol_routes.py"]),
+    Stage("community",
+          inputs=["data/crime_fixed_data.csv", "data/lsoa_to_ward.json"],
+          outputs=["data/community/community_aggregates.json"],
+          command=["community_aggregates.py"],
+          code=["community_aggregates.py"]),
+    Stage("community_static",
+          inputs=["data/crime_fixed_data.csv", "data/lsoa_to_ward.json", "data/wards.geojson"],
+          outputs=["community-tool/data/seasonal_counts.json", "community-tool/data/ward_6months.json"],
+          command=["community_static.py"],
+          code=["community_static.py", "Police_dashboard/geometry.py"]),
+]
+
+# ─── Graph ────────────────────────────────────────────────────────────────────
+def dependencies(stages):
+    """stage name → names of the stages producing one of its inputs."""
+    producer = {out: s.name for s in stages for out in s.outputs}
+    return {s.name: {producer[i] for i in s.inputs if i in producer} for s in stages}
+
+def downstream(stages, names):
+    deps = dependencies(stages)
+    result = set(names)
+    changed = True
+    while changed:
+        changed = False
+        for stage, parents in deps.items():
+            if stage not in result and parents & result:
+                result.add(stage)
+                changed = True
+    return result
+
+def expand(patterns):
+    files = []
+    for pattern in patterns:
+        if any(ch in pattern for ch in "*?["):
+            files.extend(sorted(glob.glob(pattern)))
+        else:
+            files.append(pattern)
+    return files
+
+# ─── State ────────────────────────────────────────────────────────────────────
+def load_state():
+    if not os.path.exists(STATE_PATH):
+        return {"stages": {}, "files": {}}
+    with open(STATE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_state(state):
+    atomic_write_json(STATE_PATH, state, indent=2)
+
+def stage_hash(stage, state):
+    inputs = expand(stage.inputs)
+    missing = [p for p in inputs if not os.path.exists(p)]
+    if missing:
+        raise FileNotFoundError(f"Stage '{stage.name}' is missing inputs: {', '.join(missing)}")
+    digest, stats = lineage_hash(inputs, stage.code, state["files"])
+    state["files"].update(stats)
+    return digest
+
+# ─── Execution ────────────────────────────────────────────────────────────────
+def run_stage(stage):
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_path = os.path.join(LOG_DIR, f"{stage.name}.log")
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.run([sys.executable, *stage.command], cwd=ROOT_DIR, stdout=log, stderr=subprocess.STDOUT)
+    return proc.returncode, time.perf_counter() - start, log_path
+
+def run_pipeline(stages=STAGES, force=(), dry_run=False, workers=4):
+    os.chdir(ROOT_DIR)
+    state = load_state()
+    deps = dependencies(stages)
+    forced = downstream(stages, force)
+    by_name = {s.name: s for s in stages}
+
+    done, failed, would_run = set(), set(), set()
+    pending = [s.name for s in stages]
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for name in list(pending):
+                if deps[name] & failed:
+                    print(f"✗ {name}: blocked by failed dependency")
+                    pending.remove(name)
+                    failed.add(name)
+                    continue
+                if not deps[name] <= done:
+                    continue
+                pending.remove(name)
+                stage = by_name[name]
+
+                if dry_run and (deps[name] & would_run or name in forced):
+                    print(f"▶ {name}: would run")
+                    would_run.add(name)
+                    done.add(name)
+                    continue
+
+                try:
+                    digest = stage_hash(stage, state)
+                except FileNotFoundError as e:
+                    print(f"✗ {name}: {e}")
+                    failed.add(name)
+                    continue
+
+                up_to_date = (
+                    name not in forced
+                    and state["stages"].get(name) == digest
+                    and all(os.path.exists(p) for p in stage.outputs)
+                )
+                if up_to_date:
+                    print(f"· {name}: up to date")
+                    done.add(name)
+                    continue
+                if dry_run:
+                    print(f"▶ {name}: would run")
+                    would_run.add(name)
+                    done.add(name)
+                    continue
+
+                print(f"▶ {name}: running {' '.join(stage.command)}")
+                running[pool.submit(run_stage, stage)] = (name, digest)
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, digest = running.pop(future)
+                code, seconds, log_path = future.result()
+                if code == 0:
+                    print(f"✓ {name}: done in {seconds:.1f}s")
+                    state["stages"][name] = digest
+                    save_state(state)
+                    done.add(name)
+                else:
+                    print(f"✗ {name}: exit code {code}, see {log_path}")
+                    failed.add(name)
+
+    save_state(state)
+    return not failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the pipeline stages whose inputs or code changed.")
+    parser.add_argument("--force", nargs="*", default=[], help="Stages to rerun regardless of their hash ('all' for every stage).")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages would run.")
+    parser.add_argument("--workers", type=int, default=4, help="Maximum stages running at once.")
+    args = parser.parse_args()
+
+    force = [s.name for s in STAGES] if "all" in args.force else args.force
+    ok = run_pipeline(force=force, dry_run=args.dry_run, workers=args.workers)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,211 @@
+"""
+Replay a month of hourly burglary risk against patrol schedules and report
+how much of it each ward's officers cover.
+
+Risk: every LSOA's predicted burglaries for the month (the forecast). With
+--month another calendar month is replayed, the forecast scaled by each
+ward's historical month-of-year index from the master data (burglaries in
+that calendar month relative to the ward's average month). The risk is
+spread over the hours of the month by an hour-of-day x weekday profile.
+police.uk records carry no time of day, so the data cannot supply one: the
+default is flat, and a profile from time-stamped incident records can be
+passed in (--profile, or `profile` in evaluate()).
+
+Presence: each officer works their shift every day and walks their route one
+LSOA per hour in visit_order, continuing the next day where they stopped. An
+LSOA-hour is covered when at least one officer is there; coverage is the
+covered share of the ward's risk.
+
+All officers of all candidate schedules are expanded into (candidate, LSOA,
+hour) keys in one go and deduplicated with np.unique, so hundreds of
+London-wide candidates are scored in batches without a per-hour loop.
+
+    python simulate_patrols.py [schedule.csv ...] [--month YYYY-MM] [--profile profile.json]
+                               [--output coverage.csv]
+"""
+import os
+import re
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+MASTER_CSV = os.path.join(ROOT_DIR, "data", "crime_fixed_data.csv")
+FORECAST_CSV = os.path.join(ROOT_DIR, "data", "burglary_next_month_forecast.csv")
+LOOKUP_JSON = os.path.join(ROOT_DIR, "data", "lsoa_to_ward.json")
+SCHEDULE_CSV = os.path.join(ROOT_DIR, "data", "allocations", "All_wards_patrol_schedule.csv")
+OUTPUT_CSV = os.path.join(ROOT_DIR, "data", "allocations", "schedule_coverage.csv")
+
+HOURS_PER_DAY = 24
+# (relative risk per hour of day 00-23, per weekday Mon-Sun); flat by default
+FLAT_PROFILE = (np.ones(HOURS_PER_DAY), np.ones(7))
+DEFAULT_SHIFT = (7, 8)  # start hour, length, for shift labels without a time range
+BATCH_CANDIDATES = 8  # ~5M officer-hours per batch for a London-wide schedule
+
+# ─── Risk ─────────────────────────────────────────────────────────────────────
+def seasonal_index(lsoa_ward, master_path=MASTER_CSV) -> pd.DataFrame:
+    """Ward x calendar month (1-12): mean burglaries in that month over the ward's mean month.
+
+    Wards without burglaries get 1 throughout. LSOA-level counts are too
+    sparse for a stable index, so it is taken per ward.
+    """
+    df = pd.read_csv(master_path, usecols=["lsoa_code", "month", "burglary_count"])
+    df["ward_code"] = df["lsoa_code"].str.strip().map(lsoa_ward)
+    df["calendar_month"] = pd.to_datetime(df["month"]).dt.month
+    monthly = df.dropna(subset=["ward_code"]).groupby(["ward_code", "month", "calendar_month"])["burglary_count"].sum()
+    by_month = monthly.groupby(level=["ward_code", "calendar_month"]).mean().unstack().reindex(columns=range(1, 13))
+    index = by_month.div(by_month.mean(axis=1), axis=0)
+    return index.replace([np.inf, -np.inf], np.nan).fillna(1.0)
+
+def load_risk(forecast_path=FORECAST_CSV, lookup_path=LOOKUP_JSON, month=None, master_path=MASTER_CSV):
+    """(per-LSOA risk frame, simulated month as a pandas Period).
+
+    `month` (default: the forecast month) replays another calendar month,
+    the forecast scaled by seasonal_index() of the ward.
+    """
+    with open(lookup_path, encoding="utf-8") as f:
+        lsoa_ward = {lsoa.strip(): w["ward_code"] for lsoa, w in json.load(f).items()}
+    forecast = pd.read_csv(forecast_path, usecols=["lsoa_code", "year_month", "predicted_burglary"])
+    forecast_month = pd.Period(forecast["year_month"].iloc[0], freq="M")
+    risk = (
+        forecast.assign(lsoa_code=forecast["lsoa_code"].str.strip())
+        .groupby("lsoa_code", as_index=False)["predicted_burglary"].sum()
+    )
+    risk["ward_code"] = risk["lsoa_code"].map(lsoa_ward)
+    risk = risk.dropna(subset=["ward_code"]).reset_index(drop=True)
+
+    month = forecast_month if month is None else pd.Period(month, freq="M")
+    if month.month != forecast_month.month:
+        index = seasonal_index(lsoa_ward, master_path)
+        scale = (index[month.month] / index[forecast_month.month].replace(0, np.nan)).fillna(1.0)
+        risk["predicted_burglary"] *= risk["ward_code"].map(scale).fillna(1.0).to_numpy()
+    return risk, month
+
+def load_profile(path):
+    """(hour weights, weekday weights) from a JSON file {"hour": [24 values], "weekday": [7 values]}."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return np.asarray(data["hour"], dtype=np.float64), np.asarray(data["weekday"], dtype=np.float64)
+
+def hourly_weights(month, profile=FLAT_PROFILE) -> np.ndarray:
+    """Share of the month's risk in each hour of `month`; sums to 1.
+
+    profile: (relative risk per hour of day 00-23, per weekday Mon-Sun).
+    """
+    hour_weights, weekday_weights = (np.asarray(p, dtype=np.float64) for p in profile)
+    if hour_weights.shape != (HOURS_PER_DAY,) or weekday_weights.shape != (7,):
+        raise ValueError("profile needs 24 hour weights and 7 weekday weights")
+    days = pd.period_range(month.start_time, month.end_time, freq="D")
+    w = weekday_weights[days.dayofweek.to_numpy()][:, None] * hour_weights[None, :]
+    return (w / w.sum()).ravel()
+
+def shift_hours(label):
+    """(start hour, length) from a label like 'Late 15:00-23:00'."""
+    m = re.search(r"(\d{1,2}):\d{2}\s*-\s*(\d{1,2}):\d{2}", str(label))
+    if not m:
+        return DEFAULT_SHIFT
+    start, end = int(m.group(1)), int(m.group(2))
+    return start, (end - start) % HOURS_PER_DAY or HOURS_PER_DAY
+
+# ─── Presence ─────────────────────────────────────────────────────────────────
+def _encode(schedules, lsoa_pos):
+    """Flat route arrays for all officers of a list of schedules."""
+    frames = []
+    for c, df in enumerate(schedules):
+        df = df[df["lsoa_code"].isin(lsoa_pos.index)]
+        order = df["visit_order"] if "visit_order" in df.columns else np.arange(len(df))
+        frames.append(pd.DataFrame({
+            "candidate": c,
+            "officer": df["ward_code"].astype(str).to_numpy() + "|" + df["officer"].astype(str).to_numpy(),
+            "shift": df["shift"].to_numpy(),
+            "lsoa": lsoa_pos[df["lsoa_code"]].to_numpy(),
+            "order": np.asarray(order),
+        }))
+    stops = pd.concat(frames, ignore_index=True).sort_values(["candidate", "officer", "order"], kind="stable")
+    officer_id, _ = pd.factorize(stops["candidate"].astype(str) + "|" + stops["officer"])
+
+    first = np.flatnonzero(np.diff(officer_id, prepend=-1))
+    hours = np.array([shift_hours(s) for s in stops["shift"].to_numpy()[first]]).reshape(-1, 2)
+    return {
+        "routes": stops["lsoa"].to_numpy(),
+        "offset": first,
+        "length": np.diff(np.r_[first, len(stops)]),
+        "candidate": stops["candidate"].to_numpy()[first],
+        "start": hours[:, 0],
+        "hours": hours[:, 1],
+    }
+
+def _presence_keys(enc, n_lsoa, n_days):
+    """Unique (candidate, LSOA, hour-of-month) keys where an officer is present."""
+    n_hours = n_days * HOURS_PER_DAY
+    per_officer = enc["hours"] * n_days
+    officer = np.repeat(np.arange(len(per_officer)), per_officer)
+    step = np.arange(per_officer.sum()) - np.repeat(np.cumsum(per_officer) - per_officer, per_officer)
+
+    shift_len = enc["hours"][officer]
+    day, hour = step // shift_len, step % shift_len
+    t = day * HOURS_PER_DAY + enc["start"][officer] + hour
+    lsoa = enc["routes"][enc["offset"][officer] + step % enc["length"][officer]]
+
+    inside = t < n_hours  # night shifts of the last day run past the month
+    key = (enc["candidate"][officer[inside]] * n_lsoa + lsoa[inside]) * n_hours + t[inside]
+    return np.unique(key)
+
+# ─── Scoring ──────────────────────────────────────────────────────────────────
+def evaluate(schedules, risk, month, profile=FLAT_PROFILE, batch=BATCH_CANDIDATES) -> pd.DataFrame:
+    """Risk-weighted coverage per candidate schedule and ward.
+
+    schedules: list of schedule frames (officer, ward_code, shift, lsoa_code
+    and optionally visit_order); profile: see hourly_weights(). Returns
+    candidate, ward_code, risk, covered_risk, coverage.
+    """
+    lsoa_pos = pd.Series(np.arange(len(risk)), index=risk["lsoa_code"])
+    ward_codes, ward_idx = np.unique(risk["ward_code"].to_numpy(), return_inverse=True)
+    pred = risk["predicted_burglary"].to_numpy(dtype=np.float64)
+    w = hourly_weights(month, profile)
+    n_lsoa, n_hours, n_wards = len(risk), len(w), len(ward_codes)
+    ward_risk = np.bincount(ward_idx, weights=pred, minlength=n_wards)
+
+    covered = np.zeros((len(schedules), n_wards))
+    for b in range(0, len(schedules), batch):
+        enc = _encode(schedules[b:b + batch], lsoa_pos)
+        key = _presence_keys(enc, n_lsoa, n_hours // HOURS_PER_DAY)
+        c, rest = np.divmod(key, n_lsoa * n_hours)
+        lsoa, t = np.divmod(rest, n_hours)
+        flat = np.bincount(c * n_wards + ward_idx[lsoa], weights=pred[lsoa] * w[t],
+                           minlength=min(batch, len(schedules) - b) * n_wards)
+        covered[b:b + batch] = flat.reshape(-1, n_wards)
+
+    out = pd.DataFrame({
+        "candidate": np.repeat(np.arange(len(schedules)), n_wards),
+        "ward_code": np.tile(ward_codes, len(schedules)),
+        "risk": np.tile(ward_risk, len(schedules)),
+        "covered_risk": covered.ravel(),
+    })
+    out["coverage"] = (out["covered_risk"] / out["risk"]).fillna(0.0)
+    return out
+
+def london_coverage(result) -> pd.Series:
+    """Share of London's risk covered, per candidate."""
+    totals = result.groupby("candidate")[["covered_risk", "risk"]].sum()
+    return totals["covered_risk"] / totals["risk"]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score patrol schedules against the forecast risk.")
+    parser.add_argument("schedules", nargs="*", default=[SCHEDULE_CSV], help="Schedule CSV files (candidates).")
+    parser.add_argument("--month", default=None, help="Calendar month to replay, YYYY-MM (default: the forecast month).")
+    parser.add_argument("--profile", default=None,
+                        help='JSON file {"hour": [24 weights], "weekday": [7 weights]} (default: flat).')
+    parser.add_argument("--output", default=OUTPUT_CSV, help="Per-ward coverage CSV.")
+    args = parser.parse_args()
+
+    risk, month = load_risk(month=args.month)
+    profile = load_profile(args.profile) if args.profile else FLAT_PROFILE
+    result = evaluate([pd.read_csv(p) for p in args.schedules], risk, month, profile)
+    result.insert(1, "schedule", np.asarray(args.schedules)[result["candidate"]])
+    result.to_csv(args.output, index=False)
+    for path, share in zip(args.schedules, london_coverage(result)):
+        print(f"{share:6.1%} of {month} risk covered  {path}")
+    print(f"Per-ward coverage written to {args.output}")
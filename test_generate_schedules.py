@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from generate_schedules import SHIFTS, allocate, allocate_shifts, load_officers
+
+def test_allocate_balances_load_and_caps_lsoas():
+    # ward 0: two officers share 24 burglaries; ward 1: one officer, room for 3 of its 4 LSOAs
+    ward_idx = [0, 0, 0, 0, 0, 0, 1, 1, 1, 1]
+    risk = np.array([5, 4, 3, 3, 2, 1, 10, 1, 1, 1], dtype=float)
+    officer = allocate(ward_idx, risk, officers=[2, 1], max_lsoas=3)
+
+    assert (officer[:6] >= 0).all()
+    assert np.bincount(officer[:6], weights=risk[:6]).tolist() == [9.0, 9.0]
+    assert officer[6:].tolist() == [0, 0, 0, -1]  # the lowest-risk LSOA stays unassigned
+
+def test_allocate_shifts_balances_per_officer_across_shifts():
+    # 4 officers: Early has two (officers 0 and 3), Late and Night one each
+    risk = np.array([8, 4, 4, 4, 4, 4, 4], dtype=float)
+    officer = allocate_shifts(np.zeros(len(risk), dtype=int), risk, officers=[4], max_lsoas=8)
+
+    assert np.bincount(officer, weights=risk, minlength=4).tolist() == [8.0, 8.0, 8.0, 8.0]
+    assert sorted(np.unique(officer % len(SHIFTS))) == [0, 1, 2]
+
+def test_load_officers_defaults_blank_cells(tmp_path):
+    path = tmp_path / "officers_per_ward.csv"
+    path.write_text("ward_code,officers\nE1,\nE2,6\n")
+    assert load_officers(["E1", "E2", "E3"], default=4, path=str(path)).tolist() == [4, 6, 4]
+
+def test_load_officers_rejects_invalid_counts(tmp_path):
+    path = tmp_path / "officers_per_ward.csv"
+    path.write_text("ward_code,officers\nE1,-2\nE2,two\n")
+    with pytest.raises(ValueError, match="E1"):
+        load_officers(["E1", "E2"], path=str(path))
@@ -0,0 +1,18 @@
+import numpy as np
+
+from patrol_routes import haversine_matrix, nearest_neighbour, two_opt
+
+def path_km(dist, route):
+    return dist[route[:-1], route[1:]].sum()
+
+def test_two_opt_never_lengthens_a_path():
+    rng = np.random.default_rng(0)
+    for n in (2, 3, 5, 8, 12):
+        lat = 51.5 + rng.uniform(-0.02, 0.02, n)
+        lon = -0.1 + rng.uniform(-0.03, 0.03, n)
+        dist = haversine_matrix(lat, lon)
+        for start in (nearest_neighbour(dist), np.r_[0, rng.permutation(np.arange(1, n))]):
+            route = two_opt(dist, start)
+            assert route[0] == start[0]
+            assert sorted(route) == list(range(n))
+            assert path_km(dist, route) <= path_km(dist, start) + 1e-9
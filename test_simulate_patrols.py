@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from simulate_patrols import evaluate
+
+# with the default flat profile every hour of the month carries the same
+# share of risk, so coverage is hours covered / hours in the month
+
+def risk_frame(**lsoa_risk):
+    return pd.DataFrame({
+        "lsoa_code": list(lsoa_risk),
+        "ward_code": "W1",
+        "predicted_burglary": list(lsoa_risk.values()),
+    })
+
+def schedule(shift, *lsoas):
+    return pd.DataFrame({
+        "officer": "W1_Officer_1", "ward_code": "W1", "shift": shift,
+        "lsoa_code": list(lsoas), "visit_order": np.arange(1, len(lsoas) + 1),
+    })
+
+def test_single_officer_day_shift():
+    # 8 hours a day alternating A and B: each LSOA is covered 4 of 24 hours
+    risk = risk_frame(A=3.0, B=1.0)
+    result = evaluate([schedule("Early 07:00-15:00", "A", "B")], risk, pd.Period("2024-04", "M"))
+    assert result["covered_risk"].iloc[0] == pytest.approx(3 * 4 / 24 + 1 * 4 / 24)
+    assert result["coverage"].iloc[0] == pytest.approx((16 / 24) / 4)
+
+def test_night_shift_wraps_past_midnight():
+    # 30 nights of 23:00-07:00; the last night's 7 hours after midnight fall outside April
+    risk = risk_frame(A=2.0)
+    result = evaluate([schedule("Night 23:00-07:00", "A")], risk, pd.Period("2024-04", "M"))
+    assert result["covered_risk"].iloc[0] == pytest.approx(2.0 * (30 * 8 - 7) / (30 * 24))
+
+def test_profile_changes_coverage():
+    # all risk between 23:00 and 07:00: the early shift (07-15) covers none of it
+    night = np.zeros(24)
+    night[[23, 0, 1, 2, 3, 4, 5, 6]] = 1.0
+    risk = risk_frame(A=2.0)
+    month = pd.Period("2024-04", "M")
+    early = [schedule("Early 07:00-15:00", "A")]
+
+    flat = evaluate(early, risk, month)["coverage"].iloc[0]
+    at_night = evaluate(early, risk, month, profile=(night, np.ones(7)))["coverage"].iloc[0]
+    assert flat == pytest.approx(8 / 24)
+    assert at_night == pytest.approx(0.0)
@@ -0,0 +1,57 @@
+import os
+import json
+import shutil
+import threading
+
+from filelock import FileLock, Timeout
+
+# Single-writer rule for the files both the dashboard and the pipeline scripts
+# mutate (master CSV, model, forecast, contributions, schedules): every such
+# write path holds WRITE_LOCK, an OS file lock, so threads, gunicorn workers
+# and pipeline processes are serialized alike. Readers never take it; files
+# are swapped in whole with atomic_write, so a reader sees either the old
+# version or the new one, never a half-written file.
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+LOCK_DIR = os.path.join(ROOT_DIR, "data", "cache")
+LOCK_PATH = os.path.join(LOCK_DIR, "dashboard_write.lock")
+LOCK_TIMEOUT = 600  # seconds; pipeline scripts wait out a training run
+# Dashboard requests wait much less: gunicorn kills a worker that runs past its
+# `timeout` (gunicorn.conf.py), so a request gives up early and answers "busy,
+# retry" rather than queueing behind a pipeline run until it is killed.
+REQUEST_LOCK_TIMEOUT = 10
+
+os.makedirs(LOCK_DIR, exist_ok=True)
+WRITE_LOCK = FileLock(LOCK_PATH, timeout=LOCK_TIMEOUT)
+
+def atomic_write(path, write, *args, **kwargs):
+    """Call write(tmp_path, *args, **kwargs), then rename tmp_path over `path`.
+
+    e.g. atomic_write(csv_path, df.to_csv, index=False). `write` may also
+    create a directory at tmp_path; renaming it fails with OSError if `path`
+    already exists as a non-empty directory.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp, *args, **kwargs)
+        os.replace(tmp, path)
+    finally:
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp, ignore_errors=True)
+        elif os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+def _dump_json(tmp, data, json_kwargs):
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, **json_kwargs)
+
+def _dump_bytes(tmp, data):
+    with open(tmp, "wb") as f:
+        f.write(data)
+
+def atomic_write_json(path, data, **json_kwargs):
+    return atomic_write(path, _dump_json, data, json_kwargs)
+
+def atomic_write_bytes(path, data):
+    return atomic_write(path, _dump_bytes, data)